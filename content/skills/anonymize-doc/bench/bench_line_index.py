@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Benchmark: LineIndex vs get_line_column for per-entity line/column lookup
+
+get_line_column re-splits the text for each entity, so it is timed on a
+sample of positions and extrapolated; LineIndex is timed on all of them
+(index build included). Both must agree on every sampled position.
+
+Usage:
+    python bench/bench_line_index.py [--size-mb 5] [--entities 10000] [--legacy-sample 200]
+"""
+
+import sys
+import os
+import time
+import random
+import argparse
+from typing import Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+from line_index import LineIndex  # noqa: E402
+
+
+def get_line_column(text: str, position: int) -> Tuple[int, int]:
+    """Per-call re-split lookup that detect.py used before LineIndex"""
+    lines = text[:position].split('\n')
+    return len(lines), len(lines[-1]) + 1
+
+
+def make_text(size: int, seed: int = 11) -> str:
+    rng = random.Random(seed)
+    lines, length = [], 0
+    while length < size:
+        line = ' '.join('lorem' for _ in range(rng.randint(0, 20)))
+        lines.append(line)
+        length += len(line) + 1
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark line/column lookup')
+    parser.add_argument('--size-mb', type=float, default=5.0)
+    parser.add_argument('--entities', type=int, default=10_000)
+    parser.add_argument('--legacy-sample', type=int, default=200,
+                        help='Positions timed with get_line_column (the full run is quadratic)')
+    args = parser.parse_args()
+
+    text = make_text(int(args.size_mb * 1_000_000))
+    rng = random.Random(5)
+    positions = sorted(rng.randrange(len(text)) for _ in range(args.entities))
+    sample = rng.sample(positions, min(args.legacy_sample, len(positions)))
+
+    start = time.perf_counter()
+    legacy = [get_line_column(text, p) for p in sample]
+    legacy_per_entity = (time.perf_counter() - start) / len(sample)
+
+    start = time.perf_counter()
+    index = LineIndex(text)
+    indexed = [index.line_column(p) for p in positions]
+    index_time = time.perf_counter() - start
+
+    by_position = dict(zip(positions, indexed))
+    if any(by_position[p] != expected for p, expected in zip(sample, legacy)):
+        print("MISMATCH: LineIndex and get_line_column disagree", file=sys.stderr)
+        sys.exit(1)
+
+    legacy_total = legacy_per_entity * len(positions)
+    print(f"input: {len(text):,} chars, {len(index.line_starts):,} lines, {len(positions):,} entities")
+    print(f"get_line_column : {legacy_total:10.2f} s  (extrapolated from {len(sample)} lookups)")
+    print(f"LineIndex       : {index_time:10.4f} s  ({legacy_total / index_time:,.0f}x)")
+    print("results identical on sampled positions")
+
+
+if __name__ == '__main__':
+    main()
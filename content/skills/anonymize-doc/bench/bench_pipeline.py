@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark: per-stage timings of detect.py and anonymize.py
+
+Generates synthetic documents (corpus.py) and times each stage in isolation:
+model load, PII (Scrubadub), regex patterns, prefilter, langdetect, NER,
+overlap resolution, line/column lookup and replacement per strategy, plus
+all detectors end to end, sequential and with --parallel. Writes
+a JSON report (stable keys, best-of-N seconds) to diff across commits; pass
+--baseline to print per-stage ratios against an earlier report.
+
+Without the spaCy models installed (or with --stub-ner), NER runs on a blank
+pipeline with an EntityRuler for the generated names and companies, so the
+suite works offline. Stub NER timings are not comparable to real models.
+
+Usage:
+    python bench/bench_pipeline.py [--sizes-kb 100,1000] [--density 0.3] [--languages en,fr]
+                                   [--repeat 3] [--output report.json] [--baseline old.json]
+"""
+
+import sys
+import os
+import json
+import time
+import platform
+import argparse
+import subprocess
+from typing import Callable, Dict, List, Tuple
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts')
+sys.path.insert(0, SCRIPTS_DIR)
+import spacy  # noqa: E402
+import detect  # noqa: E402
+from detect import BusinessDataDetector  # noqa: E402
+from anonymize import Anonymizer  # noqa: E402
+from line_index import LineIndex  # noqa: E402
+from spans import resolve_overlaps  # noqa: E402
+import corpus  # noqa: E402
+
+STRATEGIES = ['mask', 'hash', 'pseudo', 'token']
+
+
+def models_installed(languages: List[str]) -> bool:
+    return all(spacy.util.is_package(BusinessDataDetector.LANGUAGE_MODELS[lang]) for lang in languages)
+
+
+def install_stub_ner():
+    """Replace model loading with a blank pipeline + EntityRuler (offline, deterministic)"""
+    def load_stub(self, lang_code: str):
+        self.nlp = spacy.blank(lang_code)
+        self.nlp.add_pipe('entity_ruler').add_patterns(corpus.ruler_patterns())
+    BusinessDataDetector._load_model = load_stub
+
+
+def best_of(fn: Callable, repeat: int) -> Tuple[float, object]:
+    timings, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def bench_document(text: str, repeat: int) -> Dict:
+    stages = {}
+
+    # Model load is a one-off per process: time it once on a fresh pool
+    detect._model_pool = detect.ModelPool()
+    start = time.perf_counter()
+    runs = detect.language_runs(text)
+    languages = sorted({lang for lang, _, _ in runs})
+    for lang in languages:
+        detect.get_language_detector(lang)
+    pii_detector = detect.get_pii_detector()
+    stages['model_load'] = time.perf_counter() - start
+
+    stages['pii'], pii = best_of(lambda: pii_detector.detect(text), repeat)
+    stages['patterns'], patterns = best_of(lambda: BusinessDataDetector.detect_patterns(text), repeat)
+    stages['prefilter'], _ = best_of(lambda: detect.likely_entity_regions(text), repeat)
+    stages['langdetect'], runs = best_of(lambda: detect.language_runs(text), repeat)
+
+    by_language: Dict[str, List[Tuple[int, int]]] = {}
+    for lang, start, end in runs:
+        by_language.setdefault(lang, []).append((start, end))
+
+    def ner():
+        entities = []
+        for lang, regions in by_language.items():
+            entities.extend(detect.get_language_detector(lang).detect_ner(text, regions))
+        return entities
+    stages['ner'], ner_entities = best_of(ner, repeat)
+
+    # Workers fork from here, so they inherit the loaded (or stub) models
+    stages['detect_sequential'], _ = best_of(lambda: detect.detect_entities_local(text), repeat)
+    stages['detect_parallel'], _ = best_of(lambda: detect.detect_entities_local(text, parallel=True), repeat)
+
+    entities = pii + ner_entities + patterns
+    stages['dedup'], resolved = best_of(lambda: resolve_overlaps(entities), repeat)
+
+    def line_col():
+        index = LineIndex(text)
+        return [index.line_column(e['start']) for e in resolved]
+    stages['line_col'], _ = best_of(line_col, repeat)
+
+    for strategy in STRATEGIES:
+        # A fresh Anonymizer per run: a warm mapping store would skip generation
+        stages[f'replace_{strategy}'], _ = best_of(
+            lambda: Anonymizer(strategy, seed=0).anonymize_text(text, resolved), repeat)
+
+    detection = sum(stages[s] for s in ('pii', 'patterns', 'langdetect', 'ner', 'dedup', 'line_col'))
+    return {
+        'size_chars': len(text),
+        'languages': languages,
+        'entities': {'pii': len(pii), 'patterns': len(patterns), 'ner': len(ner_entities),
+                     'resolved': len(resolved)},
+        'stages': {stage: round(seconds, 6) for stage, seconds in stages.items()},
+        'detect_mb_per_s': round(len(text) / 1e6 / detection, 3) if detection else None,
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SCRIPTS_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def format_comparison(report: Dict, baseline: Dict) -> str:
+    lines = []
+    previous = {doc['size_chars']: doc for doc in baseline.get('documents', [])}
+    for doc in report['documents']:
+        old = previous.get(doc['size_chars'])
+        if not old:
+            continue
+        lines.append(f"{doc['size_chars']:,} chars vs {baseline['environment'].get('commit')}:")
+        for stage, seconds in doc['stages'].items():
+            before = old['stages'].get(stage)
+            if before:
+                lines.append(f"  {stage:16} {before * 1000:10.1f} ms -> {seconds * 1000:10.1f} ms  "
+                             f"({before / seconds if seconds else float('inf'):.2f}x)")
+    return '\n'.join(lines) or "No documents of matching size in the baseline"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark anonymize-doc stages on synthetic documents')
+    parser.add_argument('--sizes-kb', default='100,1000', help='Comma-separated document sizes')
+    parser.add_argument('--density', type=float, default=0.3, help='Share of sentences holding an entity')
+    parser.add_argument('--languages', default='en', help='Comma-separated: en, fr')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--stub-ner', action='store_true', help='Use the stub NER pipeline even if models exist')
+    parser.add_argument('--output', help='JSON report path (default: stdout)')
+    parser.add_argument('--baseline', help='Earlier JSON report to compare against')
+    args = parser.parse_args()
+
+    languages = args.languages.split(',')
+    stub = args.stub_ner or not models_installed(languages)
+    if stub:
+        print("spaCy models not installed or --stub-ner: NER uses a stub pipeline", file=sys.stderr)
+        install_stub_ner()
+
+    documents = []
+    for size_kb in args.sizes_kb.split(','):
+        text = corpus.generate(int(float(size_kb) * 1000), args.density, languages, args.seed)
+        documents.append(bench_document(text, args.repeat))
+        doc = documents[-1]
+        print(f"{doc['size_chars']:,} chars, {doc['entities']['resolved']:,} entities: "
+              + ", ".join(f"{stage} {seconds * 1000:.1f}ms" for stage, seconds in doc['stages'].items()),
+              file=sys.stderr)
+
+    report = {
+        'environment': {
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'spacy': spacy.__version__,
+            'ner': 'stub' if stub else 'models',
+            'detector_version': detect.DETECTOR_VERSION,
+        },
+        'config': {'density': args.density, 'languages': languages, 'seed': args.seed, 'repeat': args.repeat},
+        'documents': documents,
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            print(format_comparison(report, json.load(f)), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark: wall time of short detect.py / anonymize.py runs
+
+Each case runs the real CLI in a fresh interpreter (best of N), so import
+cost dominates: --help, a missing file, mask/hash on the regex tier, pseudo,
+and full NER detection on a small synthetic document. Each case also reports
+which heavy dependencies (Scrubadub, spaCy, langdetect, Faker) it imported;
+the import time of each of those is measured once, on its own.
+The detection server and cache are disabled so every run starts cold.
+
+Usage:
+    python bench/bench_startup.py [--repeat 5] [--output report.json]
+"""
+
+import sys
+import os
+import json
+import time
+import argparse
+import platform
+import subprocess
+import tempfile
+from typing import Dict, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS_DIR = os.path.join(BENCH_DIR, '..', 'scripts')
+sys.path.insert(0, BENCH_DIR)
+import corpus  # noqa: E402
+
+HEAVY_MODULES = ('scrubadub', 'spacy', 'langdetect', 'faker')
+
+# Runs a script as __main__ and reports the heavy modules loaded by the time it exits
+WRAPPER = (
+    "import atexit, os, runpy, sys\n"
+    f"heavy = {HEAVY_MODULES!r}\n"
+    "atexit.register(lambda: print('HEAVY_MODULES ' + ' '.join(m for m in heavy if m in sys.modules),"
+    " file=sys.stderr))\n"
+    "sys.argv = sys.argv[1:]\n"
+    "sys.path.insert(0, os.path.dirname(sys.argv[0]))\n"
+    "runpy.run_path(sys.argv[0], run_name='__main__')\n"
+)
+
+
+def cases(document: str) -> Dict[str, List[str]]:
+    detect_py = os.path.join(SCRIPTS_DIR, 'detect.py')
+    anonymize_py = os.path.join(SCRIPTS_DIR, 'anonymize.py')
+    return {
+        'detect --help': [detect_py, '--help'],
+        'anonymize --help': [anonymize_py, '--help'],
+        'anonymize missing file': [anonymize_py, os.path.join(BENCH_DIR, 'no-such-file.txt')],
+        'anonymize mask regex': [anonymize_py, document, '--strategy', 'mask', '--tier', 'regex'],
+        'anonymize hash regex': [anonymize_py, document, '--strategy', 'hash', '--tier', 'regex'],
+        'anonymize pseudo regex': [anonymize_py, document, '--strategy', 'pseudo', '--tier', 'regex'],
+        'detect full': [detect_py, document],
+    }
+
+
+def import_ms(module: str, env: Dict) -> Optional[float]:
+    """Cumulative import time of module in a fresh interpreter, or None when it is not installed"""
+    log = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                         env=env, capture_output=True, text=True).stderr
+    for line in reversed(log.splitlines()):
+        fields = line.split('|')
+        if len(fields) == 3 and fields[2].strip() == module:
+            return round(int(fields[1]) / 1000, 1)
+    return None
+
+
+def bench_case(args: List[str], env: Dict, repeat: int) -> Dict:
+    timings, loaded = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        stderr = subprocess.run([sys.executable, '-c', WRAPPER] + args, env=env,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True).stderr
+        timings.append(time.perf_counter() - start)
+        loaded = next((line.split()[1:] for line in stderr.splitlines() if line.startswith('HEAVY_MODULES')), [])
+    return {'seconds': round(min(timings), 4), 'imports': loaded}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark detect.py / anonymize.py startup')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--size-kb', type=float, default=5, help='Size of the synthetic document')
+    parser.add_argument('--output', help='JSON report path (default: stdout)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        document = os.path.join(tmp, 'startup.txt')
+        with open(document, 'w', encoding='utf-8') as f:
+            f.write(corpus.generate(int(args.size_kb * 1000)))
+        env = {**os.environ, 'ANONYMIZE_DOC_NO_SERVER': '1', 'ANONYMIZE_DOC_NO_CACHE': '1'}
+
+        modules = {module: import_ms(module, env) for module in HEAVY_MODULES}
+        print("import cost: " + ", ".join(f"{module} {ms:.0f}ms" for module, ms in modules.items() if ms is not None),
+              file=sys.stderr)
+        results = {}
+        for name, case_args in cases(document).items():
+            results[name] = bench_case(case_args, env, args.repeat)
+            print(f"{name:24} {results[name]['seconds'] * 1000:8.1f} ms   imports: "
+                  f"{', '.join(results[name]['imports']) or 'none'}", file=sys.stderr)
+
+    report = {
+        'environment': {'python': platform.python_version()},
+        'import_ms': modules,
+        'config': {'repeat': args.repeat, 'size_kb': args.size_kb},
+        'cases': results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Synthetic corpus generator for anonymize-doc benchmarks
+
+Builds paragraph-structured documents of a given size where a configurable
+share of sentences carries an entity: person names (plain and in labelled
+contexts), companies, emails, FINANCIAL_PATTERNS phrases and departments.
+Output is deterministic for a given seed, so timings are comparable across
+commits.
+
+Usage:
+    python bench/corpus.py --size-kb 500 [--density 0.3] [--languages en,fr] [-o doc.txt]
+"""
+
+import sys
+import random
+import argparse
+from typing import Dict, List
+
+FIRST_NAMES = ['John', 'Maria', 'Emily', 'Ahmed', 'Chen', 'Sophie', 'Lucas', 'Fatima', 'Olivier', 'Grace']
+LAST_NAMES = ['Smith', 'Garcia', 'Johnson', 'Benali', 'Wang', 'Martin', 'Dubois', 'Okafor', 'Moreau', 'Lee']
+COMPANIES = ['Acme Corp', 'Globex Industries', 'Initech', 'Umbrella Holdings', 'Stark Analytics', 'Soylent SA']
+DEPARTMENTS = ['Engineering', 'Sales', 'Marketing', 'Human Resources', 'Finance', 'Customer Success', 'Legal']
+FINANCIAL = [
+    '${n}M revenue', 'EUR {n}K operating costs', '${n}B TAM', '${n}/month', '{n}% margin',
+    '{n}% market share', '{n} employees', 'team of {n}', 'USD {n}M ARR', '{n}% growth',
+]
+
+FILLER = {
+    'en': ("the quarter closed with strong results across teams and we plan to expand our "
+           "footprint next year while keeping spending under control as agreed in the "
+           "previous review of the roadmap").split(),
+    'fr': ("le trimestre s'est terminé avec de bons résultats pour les équipes et nous "
+           "prévoyons de poursuivre la croissance tout en maîtrisant les dépenses comme "
+           "convenu lors de la revue précédente de la feuille de route").split(),
+}
+
+
+def _person(rng: random.Random) -> str:
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def _entity(rng: random.Random) -> str:
+    kind = rng.randrange(6)
+    if kind == 0:
+        return _person(rng)
+    if kind == 1:
+        return f"{rng.choice(['Author', 'Contact', 'Owner', 'Manager'])}: {_person(rng)}"
+    if kind == 2:
+        return rng.choice(COMPANIES)
+    if kind == 3:
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        return f"{first}.{last}@{rng.choice(['example.com', 'acme.io', 'globex.fr'])}".lower()
+    if kind == 4:
+        return rng.choice(FINANCIAL).format(n=rng.randint(2, 950))
+    return rng.choice(DEPARTMENTS)
+
+
+def _sentence(rng: random.Random, lang: str, density: float) -> str:
+    words = [rng.choice(FILLER[lang]) for _ in range(rng.randint(8, 20))]
+    if rng.random() < density:
+        words.insert(rng.randrange(1, len(words)), _entity(rng))
+    sentence = ' '.join(words)
+    return sentence[0].upper() + sentence[1:] + '.'
+
+
+def generate(size: int, density: float = 0.3, languages: List[str] = ('en',), seed: int = 7) -> str:
+    """About size chars of paragraphs; density is the share of sentences holding an entity.
+
+    With several languages, consecutive paragraphs switch language in blocks.
+    """
+    rng = random.Random(seed)
+    paragraphs, length = [], 0
+    lang = languages[0]
+    while length < size:
+        if len(languages) > 1 and rng.random() < 0.2:
+            lang = rng.choice(languages)
+        paragraph = ' '.join(_sentence(rng, lang, density) for _ in range(rng.randint(2, 6)))
+        paragraphs.append(paragraph)
+        length += len(paragraph) + 2
+    return '\n\n'.join(paragraphs)
+
+
+def ruler_patterns() -> List[Dict]:
+    """spaCy EntityRuler patterns for the generated names and companies (stub NER)"""
+    patterns = [{'label': 'PERSON', 'pattern': [{'TEXT': first}, {'TEXT': last}]}
+                for first in FIRST_NAMES for last in LAST_NAMES]
+    patterns += [{'label': 'ORG', 'pattern': company} for company in COMPANIES]
+    return patterns
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic document for anonymize-doc benchmarks')
+    parser.add_argument('--size-kb', type=float, default=100)
+    parser.add_argument('--density', type=float, default=0.3, help='Share of sentences holding an entity')
+    parser.add_argument('--languages', default='en', help='Comma-separated: en, fr')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('-o', '--output', help='Output file (default: stdout)')
+    args = parser.parse_args()
+
+    text = generate(int(args.size_kb * 1000), args.density, args.languages.split(','), args.seed)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        sys.stdout.write(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -7,10 +7,13 @@ masking, hashing, pseudonymization, tokenization, or mixed.
 
 Usage:
     python anonymize.py <file_path> --strategy <mask|hash|pseudo|token|mixed>
+                        [--mapping-store <mappings.db>] [--seed <int>] [--profile]
+                        [--stream] [--parallel] [--incremental]
+                        [--format auto|text|csv|tsv|jsonl|json|yaml] [--policy FIELD=ACTION ...]
 
 Output:
     - <file>-anonymized.<ext>: Anonymized file
-    - <file>-audit-log.json: Audit trail with mappings (if reversible)
+    - <file>-audit-log.jsonl: Audit trail with mappings (if reversible), see audit_log.py
 """
 
 import sys
@@ -21,27 +24,18 @@ import hashlib
 import secrets
 import argparse
 from pathlib import Path
-from typing import List, Dict, Tuple
-from datetime import datetime, timezone
-
-try:
-    import scrubadub
-    import spacy
-except ImportError:
-    print("Error: Required packages not installed.", file=sys.stderr)
-    print("Run: pip install scrubadub spacy faker", file=sys.stderr)
-    print("     python -m spacy download en_core_web_sm", file=sys.stderr)
-    sys.exit(1)
-
-try:
-    from faker import Faker
-except ImportError:
-    print("Error: faker not installed. Run: pip install faker", file=sys.stderr)
-    sys.exit(1)
+from typing import Callable, List, Dict, Tuple
 
 # Fix import: add scripts directory to path so detect.py can be found
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-from detect import PIIDetector, BusinessDataDetector, get_line_column
+import deps  # Faker (and, via detect.py, Scrubadub/spaCy/langdetect) is imported on first use
+from detect import detect_entities, detect_entities_incremental, parallel_enabled, TIERS
+from line_index import LineIndex
+from spans import resolve_overlaps
+from mapping_store import MappingStore, normalize
+from profiling import Profiler, profiling_enabled, format_profile
+from structured import format_for, parse_policies, anonymize_structured
+from audit_log import AuditLogWriter, audit_log_path as get_audit_log_path
 
 
 # Mixed strategy severity-to-strategy mapping
@@ -73,20 +67,36 @@ class Anonymizer:
         'support': 'Client Services',
     }
 
-    def __init__(self, strategy: str):
-        self.strategy = strategy
-        self.faker = Faker()
-        self.token_cache = {}
-
-    def anonymize_text(self, text: str, entities: List[Dict]) -> Tuple[str, List[Dict]]:
-        """Anonymize text based on detected entities. Returns (anonymized_text, mappings)."""
-        # Sort descending by position to avoid offset shifts
-        entities_sorted = sorted(entities, key=lambda x: x['start'], reverse=True)
+    # Fresh pseudonyms/tokens tried before accepting one already used for another original
+    MAX_REPLACEMENT_ATTEMPTS = 5
 
-        anonymized_text = text
+    def __init__(self, strategy: str, store: MappingStore = None, seed: int = None):
+        self.strategy = strategy
+        self._faker = None
+        self.store = store or MappingStore()
+        self.seed = seed
+
+    @property
+    def faker(self):
+        """Built on first use: mask and hash never need Faker"""
+        if self._faker is None:
+            self._faker = deps.faker()
+        return self._faker
+
+    def anonymize_text(self, text: str, entities: List[Dict], first_line: int = 1, first_column: int = 1,
+                       sink: Callable[[Dict], None] = None) -> Tuple[str, List[Dict]]:
+        """Anonymize text based on detected entities. Returns (anonymized_text, mappings).
+
+        Builds the output in one forward pass over non-overlapping spans (see spans.resolve_overlaps).
+        first_line/first_column place text within a larger file, for the mappings' line/column.
+        With a sink (e.g. AuditLogWriter.write), mappings are handed to it instead of returned.
+        """
+        segments = []
+        cursor = 0
         mappings = []
+        line_index = LineIndex(text)
 
-        for entity in entities_sorted:
+        for entity in resolve_overlaps(entities):
             original = entity['text']
             entity_type = entity['type']
             start, end = entity['start'], entity['end']
@@ -97,10 +107,15 @@ class Anonymizer:
                 effective_strategy = MIXED_STRATEGY_MAP.get(entity['severity'], 'pseudo')
 
             replacement = self._apply_strategy(original, entity_type, entity['category'], effective_strategy)
-            anonymized_text = anonymized_text[:start] + replacement + anonymized_text[end:]
-
-            line, col = get_line_column(text, start)
-            mappings.append({
+            segments.append(text[cursor:start])
+            segments.append(replacement)
+            cursor = end
+
+            line, col = line_index.line_column(start)
+            if line == 1:
+                col += first_column - 1
+            line += first_line - 1
+            (sink or mappings.append)({
                 'type': entity_type,
                 'category': entity['category'],
                 'original': original,
@@ -110,19 +125,40 @@ class Anonymizer:
                 'column': col,
             })
 
-        return anonymized_text, mappings
+        segments.append(text[cursor:])
+        return ''.join(segments), mappings
 
     def _apply_strategy(self, text: str, entity_type: str, category: str, strategy: str) -> str:
         if strategy == 'mask':
             return self._mask(text, entity_type)
         elif strategy == 'hash':
             return self._hash(text)
-        elif strategy == 'pseudo':
-            return self._pseudonymize(text, entity_type, category)
-        elif strategy == 'token':
-            return self._tokenize(text)
+        elif strategy in ('pseudo', 'token'):
+            return self._consistent_replacement(text, entity_type, category, strategy)
         return text
 
+    def _consistent_replacement(self, text: str, entity_type: str, category: str, strategy: str) -> str:
+        """Reuse the stored replacement for this entity, else generate one and store it"""
+        existing = self.store.get(entity_type, text, strategy)
+        if existing is not None:
+            return existing
+        for attempt in range(self.MAX_REPLACEMENT_ATTEMPTS):
+            self._seed_faker(text, entity_type, strategy, attempt)
+            if strategy == 'pseudo':
+                replacement = self._pseudonymize(text, entity_type, category)
+            else:
+                replacement = self._tokenize(text)
+            if not self.store.is_taken(strategy, replacement):
+                break
+        return self.store.put(entity_type, text, strategy, replacement)
+
+    def _seed_faker(self, text: str, entity_type: str, strategy: str, attempt: int):
+        """With a seed, derive Faker's state from the entity itself so output is reproducible"""
+        if self.seed is None:
+            return
+        key = f"{self.seed}\0{entity_type}\0{normalize(text)}\0{strategy}\0{attempt}"
+        self.faker.seed_instance(int.from_bytes(hashlib.sha256(key.encode('utf-8')).digest()[:8], 'big'))
+
     def _mask(self, text: str, entity_type: str) -> str:
         if entity_type in ('EMAIL',) and '@' in text:
             username, domain = text.split('@', 1)
@@ -215,93 +251,194 @@ class Anonymizer:
         return re.sub(r'([\d,]+\.?\d*)\s*([KMB])?', formatted, text, count=1)
 
     def _tokenize(self, text: str) -> str:
-        if text in self.token_cache:
-            return self.token_cache[text]
-        token = f"TKN_{secrets.token_hex(4)}"
-        self.token_cache[text] = token
-        return token
+        if self.seed is None:
+            return f"TKN_{secrets.token_hex(4)}"
+        return f"TKN_{self.faker.random.getrandbits(32):08x}"
 
 
-def anonymize_file(file_path: str, strategy: str) -> Dict:
+def anonymize_file(file_path: str, strategy: str, use_cache: bool = True,
+                   mapping_store: str = None, seed: int = None, tier: str = 'full',
+                   profile: bool = False, parallel: bool = False, incremental: bool = False) -> Dict:
     """Anonymize a file and produce output files."""
+    profiler = Profiler(profiling_enabled(profile))
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
+        with profiler.stage('read'), open(file_path, 'r', encoding='utf-8') as f:
             text = f.read()
     except Exception as e:
         return {'error': f'Failed to read file: {e}', 'file': file_path}
 
-    # Detect entities
-    all_entities = PIIDetector().detect(text) + BusinessDataDetector().detect(text)
-
-    # Deduplicate
-    unique_entities = []
-    seen = set()
-    for entity in sorted(all_entities, key=lambda x: x['start']):
-        key = (entity['start'], entity['end'])
-        if key not in seen:
-            unique_entities.append(entity)
-            seen.add(key)
+    # Opened before detection and before any output exists: a bad path fails fast, leaving nothing behind
+    try:
+        store = MappingStore(mapping_store)
+    except OSError as e:
+        return {'error': f'Failed to open mapping store: {e}', 'file': file_path}
+    with store:
+        return _anonymize_text(text, file_path, strategy, store, use_cache, seed, tier, profiler,
+                               parallel, incremental)
+
+
+def _anonymize_text(text: str, file_path: str, strategy: str, store: MappingStore, use_cache: bool,
+                    seed: int, tier: str, profiler: Profiler, parallel: bool, incremental: bool) -> Dict:
+    # Detect entities (same detectors and language routing as detect.py)
+    stats = {}
+    with profiler.stage('detect'):
+        if incremental:
+            pii_entities, business_entities = detect_entities_incremental(text, file_path, tier, stats,
+                                                                          parallel_enabled(parallel), use_cache)
+        else:
+            pii_entities, business_entities = detect_entities(text, use_cache=use_cache, tier=tier, stats=stats,
+                                                              parallel=parallel_enabled(parallel))
+    profiler.add_detection(stats)
+    with profiler.stage('dedup'):
+        unique_entities = resolve_overlaps(pii_entities + business_entities)
+    profiler.count('resolved', len(unique_entities))
 
     if not unique_entities:
         return {'error': 'No sensitive data detected. Nothing to anonymize.', 'file': file_path}
 
-    # Anonymize
-    anonymizer = Anonymizer(strategy)
-    anonymized_text, mappings = anonymizer.anonymize_text(text, unique_entities)
-
     # Output paths
     fp = Path(file_path)
     anonymized_path = fp.parent / f"{fp.stem}-anonymized{fp.suffix}"
-    audit_log_path = fp.parent / f"{fp.stem}-audit-log.json"
+    audit_log_path = get_audit_log_path(file_path)
 
+    # Anonymize (an in-memory store keeps replacements consistent within this run only);
+    # mappings stream straight into the audit log
     try:
-        with open(anonymized_path, 'w', encoding='utf-8') as f:
-            f.write(anonymized_text)
-    except Exception as e:
-        return {'error': f'Failed to write anonymized file: {e}', 'file': file_path}
-
-    # Determine reversibility
-    if strategy == 'mixed':
-        has_reversible = any(m['strategy'] in ('pseudo', 'token') for m in mappings)
-    else:
-        has_reversible = strategy in ('pseudo', 'token')
-
-    # Build type counts
-    by_type = {}
-    for m in mappings:
-        by_type[m['type']] = by_type.get(m['type'], 0) + 1
-
-    pii_count = sum(1 for m in mappings if m['category'] == 'PII')
-    business_count = sum(1 for m in mappings if m['category'] == 'BUSINESS')
+        with AuditLogWriter(audit_log_path, file_path, anonymized_path, strategy) as audit:
+            with profiler.stage('replace'):
+                anonymizer = Anonymizer(strategy, store=store, seed=seed)
+                anonymized_text, _ = anonymizer.anonymize_text(text, unique_entities, sink=audit.write)
+            try:
+                with profiler.stage('write'), open(anonymized_path, 'w', encoding='utf-8') as f:
+                    f.write(anonymized_text)
+            except Exception as e:
+                return {'error': f'Failed to write anonymized file: {e}', 'file': file_path}
+            profile_report = profiler.report() if profiler.enabled else None
+            summary = audit.close(**({'profile': profile_report} if profile_report else {}))
+    except OSError as e:
+        return {'error': f'Failed to write audit log: {e}', 'file': file_path}
 
-    audit_log = {
+    result = {
+        'success': True,
         'original_file': file_path,
         'anonymized_file': str(anonymized_path),
-        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'audit_log': audit_log_path,
         'strategy': strategy,
-        'reversible': has_reversible,
-        'mappings': mappings if has_reversible else [],
-        'summary': {
-            'total_entities': len(mappings),
-            'by_category': {'PII': pii_count, 'BUSINESS': business_count},
-            'by_type': by_type,
-        },
+        'summary': summary,
     }
+    if profile_report:
+        result['profile'] = profile_report
+    return result
+
+
+# Streaming mode: memory is bounded by STREAM_CHUNK_CHARS + STREAM_OVERLAP_CHARS, not file size
+STREAM_CHUNK_CHARS = 1_000_000
+STREAM_OVERLAP_CHARS = 2_000
+
+
+def _commit_point(buffer: str, overlap: int) -> int:
+    """Where to cut a non-final buffer: the last line break (else space) before the overlap tail"""
+    limit = len(buffer) - overlap
+    for sep in ('\n', ' '):
+        cut = buffer.rfind(sep, 0, limit)
+        if cut > 0:
+            return cut + 1
+    return max(limit, 1)
+
+
+def anonymize_stream(file_path: str, strategy: str, mapping_store: str = None, seed: int = None,
+                     tier: str = 'full', profile: bool = False, parallel: bool = False,
+                     chunk_chars: int = STREAM_CHUNK_CHARS, overlap: int = STREAM_OVERLAP_CHARS) -> Dict:
+    """Anonymize a file of any size chunk by chunk, writing output and audit log incrementally.
+
+    Each buffer is detected with up to overlap chars of already written text
+    before it, but only entities starting inside it and before its commit point
+    are replaced; the tail (at least overlap chars) is carried into the next
+    buffer. Entities near a cut are thus always detected with context on both sides.
+    The detection cache is not used: each buffer is a one-off key.
+    """
+    profiler = Profiler(profiling_enabled(profile))
+    parallel = parallel_enabled(parallel)
+    fp = Path(file_path)
+    anonymized_path = fp.parent / f"{fp.stem}-anonymized{fp.suffix}"
+    audit_log_path = get_audit_log_path(file_path)
+    line, column = 1, 1  # file position of the buffer start
 
     try:
-        with open(audit_log_path, 'w', encoding='utf-8') as f:
-            json.dump(audit_log, f, indent=2)
-    except Exception as e:
-        return {'error': f'Failed to write audit log: {e}', 'file': file_path}
+        store = MappingStore(mapping_store)  # before any output exists
+    except OSError as e:
+        return {'error': f'Failed to open mapping store: {e}', 'file': file_path}
 
-    return {
+    try:
+        with store, open(file_path, 'r', encoding='utf-8') as src, \
+                open(anonymized_path, 'w', encoding='utf-8') as out, \
+                AuditLogWriter(audit_log_path, file_path, anonymized_path, strategy) as audit:
+            anonymizer = Anonymizer(strategy, store=store, seed=seed)
+
+            buffer = ''
+            context = ''  # end of the previous buffer's committed text, for detection only
+            while True:
+                with profiler.stage('read'):
+                    chunk = src.read(chunk_chars)
+                buffer += chunk
+                final = not chunk
+                if not buffer:
+                    break
+                if not final and len(buffer) <= overlap:
+                    continue
+
+                stats = {}
+                with profiler.stage('detect'):
+                    pii_entities, business_entities = detect_entities(context + buffer, use_cache=False,
+                                                                      tier=tier, stats=stats, parallel=parallel)
+                with profiler.stage('dedup'):
+                    shift = len(context)
+                    entities = [{**e, 'start': e['start'] - shift, 'end': e['end'] - shift}
+                                for e in resolve_overlaps(pii_entities + business_entities) if e['start'] >= shift]
+
+                cut = len(buffer) if final else _commit_point(buffer, overlap)
+                committed = [e for e in entities if e['start'] < cut]
+                if committed:
+                    cut = max(cut, max(e['end'] for e in committed))  # never split an entity
+
+                with profiler.stage('replace'):
+                    anonymized, _ = anonymizer.anonymize_text(buffer[:cut], committed, line, column,
+                                                              sink=audit.write)
+                with profiler.stage('write'):
+                    out.write(anonymized)
+
+                newlines = buffer.count('\n', 0, cut)
+                if newlines:
+                    line += newlines
+                    column = cut - buffer.rfind('\n', 0, cut)
+                else:
+                    column += cut
+                context = (context + buffer[:cut])[-overlap:]
+                buffer = buffer[cut:]
+                if final:
+                    break
+
+            profile_report = profiler.report() if profiler.enabled else None
+            summary = audit.close(**({'profile': profile_report} if profile_report else {}))
+    except UnicodeDecodeError as e:
+        # Found mid-stream: drop the partial outputs rather than leave a half-anonymized file
+        for partial in (anonymized_path, Path(audit_log_path)):
+            partial.unlink(missing_ok=True)
+        return {'error': f'Failed to read file: {e}', 'file': file_path}
+    except OSError as e:
+        return {'error': f'Failed to stream {file_path}: {e}', 'file': file_path}
+
+    result = {
         'success': True,
         'original_file': file_path,
         'anonymized_file': str(anonymized_path),
-        'audit_log': str(audit_log_path),
+        'audit_log': audit_log_path,
         'strategy': strategy,
-        'summary': audit_log['summary'],
+        'summary': summary,
     }
+    if profile_report:
+        result['profile'] = profile_report
+    return result
 
 
 def format_result(result: Dict) -> str:
@@ -345,6 +482,9 @@ def format_result(result: Dict) -> str:
     if result['strategy'] in ('pseudo', 'token', 'mixed'):
         lines.append("- WARNING: Reversible mapping in audit log - secure this file!")
 
+    if 'profile' in result:
+        lines.extend(["", format_profile(result['profile'])])
+
     return '\n'.join(lines)
 
 
@@ -353,6 +493,26 @@ def main():
     parser.add_argument('file_path', help='Path to file to anonymize')
     parser.add_argument('--strategy', choices=['mask', 'hash', 'pseudo', 'token', 'mixed'],
                         default='mask', help='Anonymization strategy (default: mask)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Re-run detection instead of reusing results cached by detect.py')
+    parser.add_argument('--mapping-store', metavar='PATH',
+                        help='SQLite file of pseudonym/token mappings, reused across files and runs')
+    parser.add_argument('--seed', type=int, help='Make pseudonyms and tokens reproducible')
+    parser.add_argument('--tier', choices=TIERS, default='full',
+                        help='Detection tier: regex (no NER), auto (NER on likely paragraphs), full (default)')
+    parser.add_argument('--profile', action='store_true',
+                        help='Record per-stage timings, entity counts and peak RSS in the audit log')
+    parser.add_argument('--stream', action='store_true',
+                        help='Process in chunks with bounded memory (files larger than RAM); JSON-lines audit log')
+    parser.add_argument('--parallel', action='store_true',
+                        help='Run Scrubadub, NER and the regex patterns in parallel processes (large documents)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Re-detect only paragraphs changed since the last --incremental run on the file')
+    parser.add_argument('--format', default='auto',
+                        choices=['auto', 'text', 'csv', 'tsv', 'jsonl', 'json', 'yaml'],
+                        help='auto (default): structured formats by extension, else free text')
+    parser.add_argument('--policy', action='append', metavar='FIELD=ACTION',
+                        help='Structured formats: ACTION is an entity type (whole value), keep, or text (NER)')
     args = parser.parse_args()
 
     if not Path(args.file_path).exists():
@@ -360,7 +520,27 @@ def main():
         sys.exit(1)
 
     print(f"Anonymizing {args.file_path} using strategy: {args.strategy}", file=sys.stderr)
-    result = anonymize_file(args.file_path, args.strategy)
+    fmt = format_for(args.file_path) if args.format == 'auto' else args.format
+    try:
+        policies = parse_policies(args.policy)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if fmt != 'text':
+        unsupported = [flag for flag, used in (('--parallel', args.parallel), ('--incremental', args.incremental),
+                                               ('--stream', args.stream and fmt in ('json', 'yaml')))
+                       if used]
+        if unsupported:
+            parser.error(f"{' and '.join(unsupported)}: not supported with --format {fmt}")
+        result = anonymize_structured(args.file_path, args.strategy, fmt, policies, mapping_store=args.mapping_store,
+                                      seed=args.seed, tier=args.tier, profile=args.profile)
+    elif args.stream:
+        result = anonymize_stream(args.file_path, args.strategy, mapping_store=args.mapping_store,
+                                  seed=args.seed, tier=args.tier, profile=args.profile, parallel=args.parallel)
+    else:
+        result = anonymize_file(args.file_path, args.strategy, use_cache=not args.no_cache,
+                                mapping_store=args.mapping_store, seed=args.seed, tier=args.tier,
+                                profile=args.profile, parallel=args.parallel, incremental=args.incremental)
 
     print(json.dumps(result, indent=2))
     print("\n" + "=" * 60, file=sys.stderr)
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Compact, streaming audit log for anonymize-doc
+
+Mappings are written as they are produced, one JSON line each, so memory no
+longer grows with the entity count. Lines:
+
+    {"audit_log": 2, "original_file": ..., "strategy": ..., "columns": [...], "interned": [...]}
+    {"intern": "PERSON_NAME"}                       # next string id (0, 1, ...)
+    [0, 1, 2, "John Smith", "Alex Brown", 12, 5]    # one mapping, values in header column order
+    {"summary": {...}, "reversible": true}          # last line
+
+Interned columns (type, category, strategy, field) hold string ids instead
+of repeating the string on every line.
+
+Usage:
+    python audit_log.py <audit-log> [--summary]    # expand mappings to JSON lines / print summary
+
+Reads this format, the indented JSON of earlier versions, and JSON lines of
+{"mapping": {...}} objects.
+"""
+
+import os
+import sys
+import json
+import argparse
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Tuple
+
+FORMAT_VERSION = 2
+TEXT_COLUMNS = ['type', 'category', 'strategy', 'original', 'replacement', 'line', 'column']
+STRUCTURED_COLUMNS = ['type', 'category', 'strategy', 'original', 'replacement', 'record', 'field']
+INTERNED = ('type', 'category', 'strategy', 'field')
+REVERSIBLE_STRATEGIES = ('pseudo', 'token')
+
+
+def audit_log_path(file_path) -> str:
+    """<stem>-audit-log.jsonl next to the original file"""
+    parent, name = os.path.split(str(file_path))
+    stem = os.path.splitext(name)[0]
+    return os.path.join(parent, f"{stem}-audit-log.jsonl")
+
+
+class AuditLogWriter:
+    """Streams mappings to a JSON-lines audit log (owner-only) and tallies the summary"""
+
+    def __init__(self, path: str, original_file: str, anonymized_file: str, strategy: str,
+                 columns: List[str] = None, **extra):
+        self.path = path
+        self.strategy = strategy
+        self.columns = columns or TEXT_COLUMNS
+        self._interned: Dict[str, int] = {}
+        self.total = 0
+        self.by_category = {'PII': 0, 'BUSINESS': 0}
+        self.by_type: Dict[str, int] = {}
+        self.reversible = False
+
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        self._file = os.fdopen(fd, 'w', encoding='utf-8')
+        self._write({
+            'audit_log': FORMAT_VERSION,
+            'original_file': original_file,
+            'anonymized_file': str(anonymized_file),
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'strategy': strategy,
+            **extra,
+            'columns': self.columns,
+            'interned': [c for c in self.columns if c in INTERNED],
+        })
+
+    def _write(self, obj):
+        self._file.write(json.dumps(obj, ensure_ascii=False, separators=(',', ':')) + '\n')
+
+    def _intern(self, value: str) -> int:
+        if value not in self._interned:
+            self._interned[value] = len(self._interned)
+            self._write({'intern': value})
+        return self._interned[value]
+
+    def write(self, mapping: Dict):
+        self.total += 1
+        self.by_category[mapping['category']] = self.by_category.get(mapping['category'], 0) + 1
+        self.by_type[mapping['type']] = self.by_type.get(mapping['type'], 0) + 1
+        # Only a reversible replacement is worth its original in the log: a masked or hashed
+        # value (also within a mixed run) must not leave its cleartext here
+        if mapping['strategy'] in REVERSIBLE_STRATEGIES:
+            self.reversible = True
+            self._write([self._intern(mapping[c]) if c in INTERNED else mapping.get(c) for c in self.columns])
+
+    def summary(self) -> Dict:
+        return {'total_entities': self.total, 'by_category': self.by_category, 'by_type': self.by_type}
+
+    def close(self, **extra) -> Dict:
+        """Write the closing summary line; returns the summary"""
+        summary = self.summary()
+        self._write({'summary': summary, 'reversible': self.reversible, **extra})
+        self._file.close()
+        return summary
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if not self._file.closed:
+            self._file.close()
+
+
+def _iter_lines(path: str) -> Iterator[Tuple[Dict, object]]:
+    """(header, item) per line after the header; items are dicts or mapping rows"""
+    with open(path, 'r', encoding='utf-8') as f:
+        first = f.readline()
+        if not first.strip():
+            return
+        try:
+            header = json.loads(first)
+        except ValueError:  # indented JSON from earlier versions
+            f.seek(0)
+            legacy = json.load(f)
+            for mapping in legacy.get('mappings', []):
+                yield legacy, {'mapping': mapping}
+            yield legacy, {'summary': legacy.get('summary'), 'reversible': legacy.get('reversible')}
+            return
+        for line in f:
+            if line.strip():
+                yield header, json.loads(line)
+
+
+def iter_mappings(path: str) -> Iterator[Dict]:
+    """Stream the mapping dicts of an audit log in document order"""
+    strings: List[str] = []
+    for header, item in _iter_lines(path):
+        if isinstance(item, list):
+            interned = set(header.get('interned', []))
+            yield {c: strings[v] if c in interned else v for c, v in zip(header['columns'], item)}
+        elif 'intern' in item:
+            strings.append(item['intern'])
+        elif 'mapping' in item:
+            yield item['mapping']
+
+
+def _last_line(f) -> bytes:
+    """Last non-empty line of a binary file, read backwards from the end"""
+    f.seek(0, os.SEEK_END)
+    end = f.tell()
+    block, tail = 4096, b''
+    while end > 0 and b'\n' not in tail.strip():
+        start = max(0, end - block)
+        f.seek(start)
+        tail = f.read(end - start) + tail
+        end = start
+    return tail.strip().rsplit(b'\n', 1)[-1]
+
+
+def read_header(path: str) -> Dict:
+    """Header fields plus the closing summary/reversible flags, without reading the mappings"""
+    with open(path, 'rb') as f:
+        first = f.readline()
+        try:
+            header = json.loads(first)
+            closing = json.loads(_last_line(f))
+        except ValueError:  # indented JSON from earlier versions
+            f.seek(0)
+            header = json.load(f)
+            closing = {}
+    info = {k: v for k, v in header.items() if k not in ('mappings', 'columns', 'interned')}
+    if isinstance(closing, dict) and 'summary' in closing:
+        info.update(closing)
+    return info
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Read an anonymize-doc audit log')
+    parser.add_argument('audit_log', help='Audit log (.jsonl, or .json from earlier versions)')
+    parser.add_argument('--summary', action='store_true', help='Print header and summary instead of mappings')
+    args = parser.parse_args()
+
+    try:
+        if args.summary:
+            print(json.dumps(read_header(args.audit_log), indent=2, ensure_ascii=False))
+        else:
+            for mapping in iter_mappings(args.audit_log):
+                print(json.dumps(mapping, ensure_ascii=False))
+    except (OSError, ValueError) as e:
+        print(f"Error: cannot read audit log {args.audit_log}: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+On-demand imports of the heavy dependencies of anonymize-doc
+
+Scrubadub, spaCy, langdetect and Faker each take from a few hundred ms to
+seconds to import, and most runs need only some of them: --help and argument
+errors need none, a detection cache hit needs none, mask/hash on the regex
+tier never touch spaCy or langdetect. Scripts call these getters where the
+library is actually used. A missing package still exits with an install
+hint, only later.
+
+Scrubadub cannot be loaded in part: its package __init__ imports every
+detector, and with them Faker, NLTK, scikit-learn and dateparser (~2.9s).
+Any run that detects pays that once; the detection server and the
+detection cache are what avoid it.
+"""
+
+import sys
+import importlib
+from importlib import metadata
+from typing import Optional
+
+INSTALL_HINTS = {
+    'scrubadub': 'pip install scrubadub',
+    'spacy': 'pip install spacy',
+    'langdetect': 'pip install langdetect',
+    'faker': 'pip install faker',
+}
+
+
+def require(module: str):
+    """Import module (once; later calls are a dict lookup), or exit with an install hint"""
+    try:
+        return importlib.import_module(module)
+    except ImportError:
+        print(f"Error: {module} not installed. Run: {INSTALL_HINTS.get(module, f'pip install {module}')}",
+              file=sys.stderr)
+        sys.exit(1)
+
+
+def scrubadub():
+    return require('scrubadub')
+
+
+def spacy():
+    return require('spacy')
+
+
+def langdetect():
+    module = require('langdetect')
+    module.DetectorFactory.seed = 0  # langdetect is randomized; paragraphs must route the same way every run
+    return module
+
+
+def faker():
+    """A new Faker instance"""
+    return require('faker').Faker()
+
+
+def package_version(distribution: str) -> Optional[str]:
+    """Installed version of a distribution without importing it, or None"""
+    try:
+        return metadata.version(distribution)
+    except metadata.PackageNotFoundError:
+        return None
@@ -6,35 +6,38 @@ Detects PII and sensitive business information using Scrubadub, spaCy NER,
 and custom regex patterns.
 
 Usage:
-    python detect.py <file_path>
+    python detect.py <file_path> [--tier regex|auto|full] [--profile] [--parallel] [--incremental]
+    python detect.py <file_or_dir> [<file_or_dir> ...] [--jobs N]   # batch mode
 
 Output:
     JSON report to stdout, formatted report to stderr
+    Batch mode: one JSON report per line, then a {"summary": ...} line
+
+When detect_server.py is running, detection is delegated to it so the models
+stay loaded between runs; otherwise everything runs in-process.
 """
 
 import sys
+import os
 import json
 import re
+import argparse
+import hashlib
+import multiprocessing
+from bisect import bisect_right
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
 from pathlib import Path
-from typing import List, Dict, Tuple
-
-try:
-    import scrubadub
-except ImportError:
-    print("Error: scrubadub not installed. Run: pip install scrubadub", file=sys.stderr)
-    sys.exit(1)
-
-try:
-    import spacy
-except ImportError:
-    print("Error: spacy not installed. Run: pip install spacy", file=sys.stderr)
-    sys.exit(1)
+from typing import List, Dict, Tuple, Iterator, Optional
 
-try:
-    from langdetect import detect, LangDetectException
-except ImportError:
-    print("Error: langdetect not installed. Run: pip install langdetect", file=sys.stderr)
-    sys.exit(1)
+import deps  # Scrubadub, spaCy and langdetect are imported on first use
+from detect_server import request_detection, NO_SERVER_ENV
+from matcher import PatternScanner, KeywordScanner
+from line_index import LineIndex
+from spans import resolve_overlaps
+from detect_cache import DetectionCache, ParagraphStore, NO_CACHE_ENV
+from profiling import Profiler, profiling_enabled, timed, format_profile
 
 
 class PIIDetector:
@@ -46,7 +49,7 @@ class PIIDetector:
     }
 
     def __init__(self):
-        self.scrubber = scrubadub.Scrubber()
+        self.scrubber = deps.scrubadub().Scrubber()
 
     def detect(self, text: str) -> List[Dict]:
         entities = []
@@ -138,148 +141,565 @@ class BusinessDataDetector:
         'DATE': ('DATE', 'BUSINESS', 'low'),
     }
 
-    def __init__(self, text: str = None):
-        """Initialize detector with optional text for language detection"""
+    # NER runs over paragraph-aligned chunks fed through nlp.pipe, so large
+    # documents never exceed nlp.max_length or materialize one giant Doc.
+    NER_CHUNK_CHARS = 100_000
+    NER_CHUNK_OVERLAP = 200  # context on each side; entities belong to the chunk they start in
+    NER_BATCH_SIZE = 4
+    # Only NER output is used; tagger/parser/lemmatizer are disabled after load
+    NER_COMPONENTS = {'tok2vec', 'transformer', 'ner'}
+    # Per-paragraph language routing: shorter paragraphs follow their neighbours
+    LANG_MIN_CHARS = 80
+    LANG_SAMPLE_CHARS = 400
+    # Paragraphs classified up front; when they all agree the document is taken as monolingual
+    LANG_PROBES = 8
+
+    def __init__(self, lang: str = 'en'):
+        """Initialize detector with the spaCy model for lang"""
         self.nlp = None
-        self.detected_language = None
+        self.detected_language = lang
+        self._load_model(lang)
 
-        if text:
-            self._load_model_for_text(text)
-        else:
-            # Default to English if no text provided
-            self._load_model('en')
-
-    def _detect_language(self, text: str) -> str:
-        """Detect language of text, return language code"""
+    @classmethod
+    def _classify_language(cls, sample: str) -> Optional[str]:
+        """Supported language code of sample, or None when undetectable or unsupported"""
+        langdetect = deps.langdetect()
         try:
-            # Use first 1000 chars for detection (performance)
-            sample = text[:1000]
-            lang = detect(sample)
-
-            # Map to supported languages, default to 'en'
-            if lang in self.LANGUAGE_MODELS:
-                return lang
-            else:
-                print(f"Detected language '{lang}' not supported, falling back to English", file=sys.stderr)
-                return 'en'
-        except LangDetectException:
-            print("Language detection failed, defaulting to English", file=sys.stderr)
-            return 'en'
-
-    def _load_model_for_text(self, text: str):
-        """Detect language and load appropriate model"""
-        self.detected_language = self._detect_language(text)
-        self._load_model(self.detected_language)
+            lang = langdetect.detect(sample)
+        except langdetect.LangDetectException:
+            return None
+        return lang if lang in cls.LANGUAGE_MODELS else None
 
     def _load_model(self, lang_code: str):
         """Load spaCy model for given language code"""
         model_name = self.LANGUAGE_MODELS.get(lang_code, 'en_core_web_md')
         try:
-            self.nlp = spacy.load(model_name)
+            self.nlp = deps.spacy().load(model_name)
+            self.nlp.select_pipes(disable=[p for p in self.nlp.pipe_names if p not in self.NER_COMPONENTS])
             print(f"Loaded spaCy model: {model_name} (language: {lang_code})", file=sys.stderr)
         except OSError:
             print(f"Error: spaCy model '{model_name}' not found.", file=sys.stderr)
             print(f"Run: python -m spacy download {model_name}", file=sys.stderr)
             sys.exit(1)
 
+    @classmethod
+    def _scanners(cls) -> Tuple[PatternScanner, PatternScanner, KeywordScanner]:
+        """Compile the pattern tables once per process (see matcher.py)"""
+        if '_compiled_scanners' not in cls.__dict__:
+            cls._compiled_scanners = (
+                PatternScanner([('PERSON_NAME', p, 0) for p in cls.NAME_PATTERNS]),
+                PatternScanner([(t, p, re.IGNORECASE) for t, ps in cls.FINANCIAL_PATTERNS.items() for p in ps]),
+                KeywordScanner(cls.DEPARTMENTS),
+            )
+        return cls._compiled_scanners
+
+    def _ner_spans(self, text: str, regions: List[Tuple[int, int]] = None) -> Iterator[Tuple[str, int, int]]:
+        """Yield (label, start, end) for every NER entity in regions (default: the whole text),
+        streaming chunks through nlp.pipe"""
+        overlap = self.NER_CHUNK_OVERLAP
+        max_chars = max(1, min(self.NER_CHUNK_CHARS, self.nlp.max_length - 2 * overlap))
+        chunks = []  # (own_start, own_end, context_start): a few ints per chunk, never the text
+
+        def windows():
+            for region_start, region_end in regions if regions is not None else [(0, len(text))]:
+                for own_start, own_end in paragraph_chunks(text, max_chars, region_start, region_end):
+                    ctx_start, ctx_end = context_window(text, own_start, own_end, overlap)
+                    chunks.append((own_start, own_end, ctx_start))
+                    yield text[ctx_start:ctx_end]
+
+        for i, doc in enumerate(self.nlp.pipe(windows(), batch_size=self.NER_BATCH_SIZE)):
+            own_start, own_end, ctx_start = chunks[i]
+            for ent in doc.ents:
+                start = ctx_start + ent.start_char
+                # Entities in the overlap belong to the neighbouring chunk: each is reported once
+                if own_start <= start < own_end:
+                    yield ent.label_, start, ctx_start + ent.end_char
+
     def detect(self, text: str) -> List[Dict]:
+        return self.detect_ner(text) + self.detect_patterns(text)
+
+    def detect_ner(self, text: str, regions: List[Tuple[int, int]] = None) -> List[Dict]:
+        """spaCy NER entities, optionally restricted to (start, end) regions of text"""
         entities = []
 
-        # spaCy NER
-        doc = self.nlp(text)
-        for ent in doc.ents:
-            if ent.label_ in self.SPACY_LABEL_MAP:
-                etype, category, severity = self.SPACY_LABEL_MAP[ent.label_]
+        # spaCy NER (chunked, offsets remapped to the full text)
+        for label, start, end in self._ner_spans(text, regions):
+            if label in self.SPACY_LABEL_MAP:
+                etype, category, severity = self.SPACY_LABEL_MAP[label]
                 entities.append({
                     'type': etype,
                     'category': category,
-                    'text': ent.text,
-                    'start': ent.start_char,
-                    'end': ent.end_char,
+                    'text': text[start:end],
+                    'start': start,
+                    'end': end,
                     'severity': severity,
                 })
+        return entities
+
+    @classmethod
+    def detect_patterns(cls, text: str) -> List[Dict]:
+        """Regex entities (names, financials, departments); needs no spaCy model"""
+        entities = []
+        name_scanner, financial_scanner, department_scanner = cls._scanners()
 
         # Name regex patterns (fallback for structured contexts)
-        for pattern in self.NAME_PATTERNS:
-            for match in re.finditer(pattern, text):
-                # Extract the name group (group 1 in all patterns)
-                name_text = match.group(1) if match.lastindex >= 1 else match.group(0)
-                # Calculate actual position of the name within the match
-                name_start = match.start() + match.group(0).index(name_text)
-                name_end = name_start + len(name_text)
-                entities.append({
-                    'type': 'PERSON_NAME',
-                    'category': 'PII',
-                    'text': name_text,
-                    'start': name_start,
-                    'end': name_end,
-                    'severity': 'medium',
-                })
+        for _, match in name_scanner.finditer(text):
+            # Extract the name group (group 1 in all patterns)
+            name_text = match.group(1) if match.lastindex >= 1 else match.group(0)
+            # Calculate actual position of the name within the match
+            name_start = match.start() + match.group(0).index(name_text)
+            name_end = name_start + len(name_text)
+            entities.append({
+                'type': 'PERSON_NAME',
+                'category': 'PII',
+                'text': name_text,
+                'start': name_start,
+                'end': name_end,
+                'severity': 'medium',
+            })
 
         # Financial regex patterns
-        for pattern_type, patterns in self.FINANCIAL_PATTERNS.items():
-            for pattern in patterns:
-                for match in re.finditer(pattern, text, re.IGNORECASE):
-                    entities.append({
-                        'type': pattern_type,
-                        'category': 'BUSINESS',
-                        'text': match.group(0),
-                        'start': match.start(),
-                        'end': match.end(),
-                        'severity': self._get_severity(pattern_type),
-                    })
+        for pattern_type, match in financial_scanner.finditer(text):
+            entities.append({
+                'type': pattern_type,
+                'category': 'BUSINESS',
+                'text': match.group(0),
+                'start': match.start(),
+                'end': match.end(),
+                'severity': cls._get_severity(pattern_type),
+            })
 
         # Departments
-        for dept in self.DEPARTMENTS:
-            for match in re.finditer(r'\b' + re.escape(dept) + r'\b', text, re.IGNORECASE):
-                entities.append({
-                    'type': 'DEPARTMENT',
-                    'category': 'BUSINESS',
-                    'text': match.group(0),
-                    'start': match.start(),
-                    'end': match.end(),
-                    'severity': 'medium',
-                })
+        for _, match in department_scanner.finditer(text):
+            entities.append({
+                'type': 'DEPARTMENT',
+                'category': 'BUSINESS',
+                'text': match.group(0),
+                'start': match.start(),
+                'end': match.end(),
+                'severity': 'medium',
+            })
 
         return entities
 
-    def _get_severity(self, entity_type: str) -> str:
-        for level, types in self.BUSINESS_SEVERITY.items():
+    @classmethod
+    def _get_severity(cls, entity_type: str) -> str:
+        for level, types in cls.BUSINESS_SEVERITY.items():
             if entity_type in types:
                 return level
         return 'low'
 
 
-def get_line_column(text: str, position: int) -> Tuple[int, int]:
-    """Convert character position to line and column number"""
-    lines = text[:position].split('\n')
-    return len(lines), len(lines[-1]) + 1
+def paragraph_chunks(text: str, max_chars: int, start: int = 0, end: int = None) -> Iterator[Tuple[int, int]]:
+    """Split text[start:end] into contiguous (start, end) chunks of at most max_chars,
+    cutting at a paragraph break, else a line break, else whitespace"""
+    n = len(text) if end is None else end
+    while start < n:
+        end = min(start + max_chars, n)
+        if end < n:
+            for sep in ('\n\n', '\n', ' '):
+                cut = text.rfind(sep, start, end)
+                if cut > start:
+                    end = cut + len(sep)
+                    break
+        yield start, end
+        start = end
+
+
+def context_window(text: str, start: int, end: int, overlap: int) -> Tuple[int, int]:
+    """Widen [start, end) by up to overlap chars each side without cutting a word"""
+    ctx_start = max(0, start - overlap)
+    if ctx_start > 0:
+        space = text.find(' ', ctx_start, start)
+        ctx_start = space + 1 if space != -1 else start
+    ctx_end = min(len(text), end + overlap)
+    if ctx_end < len(text):
+        space = text.rfind(' ', end, ctx_end)
+        ctx_end = space if space != -1 else end
+    return ctx_start, ctx_end
+
+
+# Cheap hints that a paragraph may hold something NER would tag: digits or a
+# currency sign, an all-caps token, or a capital letter in mid-sentence.
+ENTITY_HINT_RE = re.compile(r'[\d$€£]|\b[A-Z]{2,}|[^\s.!?:;"\'(\[]\s+[A-ZÀ-ÖØ-Þ]')
+PARAGRAPH_BREAK_RE = re.compile(r'\n[ \t]*\n')
+
+
+def iter_paragraphs(text: str, start: int = 0, end: int = None) -> Iterator[Tuple[int, int]]:
+    """(start, end) of each blank-line separated paragraph of text[start:end]"""
+    end = len(text) if end is None else end
+    for match in PARAGRAPH_BREAK_RE.finditer(text, start, end):
+        yield start, match.start()
+        start = match.end()
+    yield start, end
+
+
+def likely_entity_regions(text: str) -> Tuple[List[Tuple[int, int]], int]:
+    """Regions worth running NER on (consecutive hinted paragraphs merged), and the paragraph count"""
+    regions = []
+    previous_hinted = False
+    count = 0
+    for start, end in iter_paragraphs(text):
+        count += 1
+        hinted = ENTITY_HINT_RE.search(text, start, end) is not None
+        if hinted and previous_hinted:
+            regions[-1] = (regions[-1][0], end)
+        elif hinted:
+            regions.append((start, end))
+        previous_hinted = hinted
+    return regions, count
+
+
+def _probe_language(text: str, regions: List[Tuple[int, int]], classified: Dict[int, Optional[str]]) -> Optional[str]:
+    """The one language of up to LANG_PROBES evenly spaced paragraphs, or None when they disagree
+    (or there are too few paragraphs for sampling to save anything). Results go into classified."""
+    candidates = [(start, end) for region_start, region_end in regions
+                  for start, end in iter_paragraphs(text, region_start, region_end)
+                  if end - start >= BusinessDataDetector.LANG_MIN_CHARS]
+    probes = BusinessDataDetector.LANG_PROBES
+    if len(candidates) <= probes:
+        return None
+    found = set()
+    for i in range(probes):
+        start, end = candidates[i * (len(candidates) - 1) // (probes - 1)]
+        classified[start] = BusinessDataDetector._classify_language(
+            text[start:min(end, start + BusinessDataDetector.LANG_SAMPLE_CHARS)])
+        found.add(classified[start])
+    found.discard(None)
+    return found.pop() if len(found) == 1 else None
+
+
+def language_runs(text: str, regions: List[Tuple[int, int]] = None) -> List[Tuple[str, int, int]]:
+    """Split regions (default: the whole text) into (lang, start, end) runs of same-language paragraphs.
+
+    Sampled paragraphs that all agree on one language make every region a run
+    of it (the common, monolingual case: a few langdetect calls, not one per
+    paragraph). Otherwise each paragraph is classified; paragraphs too short to
+    classify, or in an unsupported language, join the run before them (leading
+    ones the first classified run; 'en' if none is).
+    """
+    regions = regions if regions is not None else [(0, len(text))]
+    classified: Dict[int, Optional[str]] = {}
+    single = _probe_language(text, regions, classified)
+    if single:
+        return [(single, start, end) for start, end in regions]
+
+    runs = []
+    first_lang = None
+    for region_start, region_end in regions:
+        region_runs = []
+        for start, end in iter_paragraphs(text, region_start, region_end):
+            lang = None
+            if start in classified:
+                lang = classified[start]
+            elif end - start >= BusinessDataDetector.LANG_MIN_CHARS:
+                lang = BusinessDataDetector._classify_language(
+                    text[start:min(end, start + BusinessDataDetector.LANG_SAMPLE_CHARS)])
+            if lang is None:
+                previous = region_runs or runs
+                lang = previous[-1][0] if previous else None
+            first_lang = first_lang or lang
+            if region_runs and region_runs[-1][0] in (lang, None):
+                region_runs[-1] = [region_runs[-1][0] or lang, region_runs[-1][1], end]
+            else:
+                region_runs.append([lang, start, end])
+        runs.extend(region_runs)
+    default = first_lang or 'en'
+    return [(lang or default, start, end) for lang, start, end in runs]
+
+
+MAX_MODELS_ENV = 'ANONYMIZE_DOC_MAX_MODELS'
+
 
+class ModelPool:
+    """Per-language BusinessDataDetectors, loaded on first use, least recently used evicted.
 
-def detect_all(file_path: str) -> Dict:
+    Each spaCy model holds hundreds of MB, so at most max_models stay loaded.
+    """
+
+    def __init__(self, max_models: int = None):
+        self.max_models = max(1, max_models or int(os.environ.get(MAX_MODELS_ENV, 2)))
+        self._detectors: 'OrderedDict[str, BusinessDataDetector]' = OrderedDict()
+
+    def get(self, lang: str) -> BusinessDataDetector:
+        if lang in self._detectors:
+            self._detectors.move_to_end(lang)
+        else:
+            while len(self._detectors) >= self.max_models:
+                self._detectors.popitem(last=False)
+            self._detectors[lang] = BusinessDataDetector(lang=lang)
+        return self._detectors[lang]
+
+    def languages(self) -> List[str]:
+        return list(self._detectors)
+
+
+# Detectors are expensive to build (scrubadub + spaCy model load), so keep them
+# per process: the detection server and batch workers reuse them across documents.
+_pii_detector = None
+_model_pool = ModelPool()
+
+
+def get_pii_detector() -> PIIDetector:
+    global _pii_detector
+    if _pii_detector is None:
+        _pii_detector = PIIDetector()
+    return _pii_detector
+
+
+def get_language_detector(lang: str) -> BusinessDataDetector:
+    return _model_pool.get(lang)
+
+
+# Detection tiers, cheapest first:
+#   regex - Scrubadub + regex patterns; no language detection, no spaCy
+#   auto  - regex, plus NER on paragraphs that pass the ENTITY_HINT_RE prefilter
+#   full  - regex, plus NER on the whole document
+TIERS = ('regex', 'auto', 'full')
+
+
+def _detect_ner(text: str, tier: str, stats: Dict) -> List[Dict]:
+    """NER for tier ('auto' or 'full'), paragraphs routed to their language's model"""
+    timings = stats.setdefault('timings', {})
+    regions = None
+    if tier == 'auto':
+        with timed(timings, 'prefilter'):
+            regions, paragraphs = likely_entity_regions(text)
+        stats['ner_scope'] = {'paragraphs': paragraphs, 'regions': len(regions),
+                              'chars': sum(end - start for start, end in regions), 'total_chars': len(text)}
+        if not regions:
+            return []
+
+    # One nlp.pipe pass per language
+    with timed(timings, 'langdetect'):
+        runs = language_runs(text, regions)
+    by_language: Dict[str, List[Tuple[int, int]]] = {}
+    for lang, start, end in runs:
+        by_language.setdefault(lang, []).append((start, end))
+    ner_entities = []
+    for lang, lang_regions in by_language.items():
+        with timed(timings, 'model_load'):
+            detector = get_language_detector(lang)
+        with timed(timings, 'ner'):
+            ner_entities.extend(detector.detect_ner(text, lang_regions))
+    ner_entities.sort(key=lambda e: e['start'])
+    stats['languages'] = {lang: sum(end - start for start, end in lang_regions)
+                          for lang, lang_regions in by_language.items()}
+    return ner_entities
+
+
+PARALLEL_ENV = 'ANONYMIZE_DOC_PARALLEL'
+PARALLEL_MIN_CHARS = 50_000  # below this, starting workers costs more than it saves
+
+# The document being detected in parallel mode. Set just before the pool forks,
+# so workers read it copy-on-write instead of receiving a pickled copy.
+_shared_text = None
+
+
+def parallel_enabled(flag: bool = False) -> bool:
+    return flag or bool(os.environ.get(PARALLEL_ENV))
+
+
+def _detection_task(task: str, tier: str, text: str = None) -> Tuple[List[Dict], Dict]:
+    """One independent detector pass ('pii', 'patterns' or 'ner'). Returns (entities, stats)."""
+    text = _shared_text if text is None else text
+    stats = {'timings': {}}
+    if task == 'pii':
+        with timed(stats['timings'], 'pii'):
+            entities = get_pii_detector().detect(text)
+    elif task == 'patterns':
+        with timed(stats['timings'], 'patterns'):
+            entities = BusinessDataDetector.detect_patterns(text)
+    else:
+        entities = _detect_ner(text, tier, stats)
+    return entities, stats
+
+
+def _run_parallel(tasks: List[str], text: str, tier: str) -> List[Tuple[List[Dict], Dict]]:
+    """Run tasks concurrently: all but the first in a process pool, the first here.
+
+    Workers are forked where possible (the text and any loaded models are shared
+    copy-on-write); elsewhere (Windows) each worker gets a copy of the text.
+    Results come back in task order whatever order the workers finish in.
+    """
+    global _shared_text
+    try:
+        context = multiprocessing.get_context('fork')
+    except ValueError:
+        context = None
+    _shared_text = text
+    try:
+        with ProcessPoolExecutor(max_workers=len(tasks) - 1, mp_context=context) as pool:
+            futures = [pool.submit(_detection_task, task, tier, None if context else text) for task in tasks[1:]]
+            local = _detection_task(tasks[0], tier, text)
+            return [local] + [future.result() for future in futures]
+    finally:
+        _shared_text = None
+
+
+def detect_entities_local(text: str, tier: str = 'full', stats: Dict = None,
+                          parallel: bool = False) -> Tuple[List[Dict], List[Dict]]:
+    """Run the detectors for tier in this process. Returns (pii_entities, business_entities).
+
+    The detectors are independent: with parallel, Scrubadub and NER run in worker
+    processes while the regex patterns run here, so wall time approaches the
+    slowest detector rather than the sum. Output is identical either way.
+    Per-stage timings, entity counts per detector and the NER scope are recorded into stats when given.
+    """
+    stats = stats if stats is not None else {}
+    stats['tier'] = tier
+    tasks = ['patterns', 'pii'] + ([] if tier == 'regex' else ['ner'])
+    if parallel and len(text) >= PARALLEL_MIN_CHARS:
+        results = _run_parallel(tasks, text, tier)
+        stats['parallel'] = len(tasks)
+    else:
+        results = [_detection_task(task, tier, text) for task in tasks]
+
+    entities = {}
+    timings = stats.setdefault('timings', {})
+    stats['entities'] = {}
+    for task, (task_entities, task_stats) in zip(tasks, results):
+        timings.update(task_stats.pop('timings'))
+        stats.update(task_stats)
+        entities[task] = task_entities
+        stats['entities'][task] = len(task_entities)
+    return entities['pii'], entities.get('ner', []) + entities['patterns']
+
+
+# Bump when detection logic changes in a way the pattern tables below don't capture
+DETECTOR_VERSION = 3
+
+
+@lru_cache(maxsize=None)
+def detector_fingerprint() -> str:
+    """Everything that can change detection output: cache entries are keyed on it.
+
+    Versions come from package metadata, so a cache hit never imports Scrubadub or spaCy.
+    """
+    parts = {
+        'detector': DETECTOR_VERSION,
+        'scrubadub': deps.package_version('scrubadub'),
+        'spacy': deps.package_version('spacy'),
+        'models': {name: deps.package_version(name) for name in BusinessDataDetector.LANGUAGE_MODELS.values()},
+        'tables': [
+            PIIDetector.SEVERITY_MAP, BusinessDataDetector.NAME_PATTERNS,
+            BusinessDataDetector.FINANCIAL_PATTERNS, BusinessDataDetector.DEPARTMENTS,
+            BusinessDataDetector.BUSINESS_SEVERITY, BusinessDataDetector.SPACY_LABEL_MAP,
+        ],
+    }
+    encoded = json.dumps(parts, sort_keys=True, default=sorted).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def detect_entities(text: str, use_cache: bool = True, tier: str = 'full',
+                    stats: Dict = None, parallel: bool = False) -> Tuple[List[Dict], List[Dict]]:
+    """Run the detectors for tier: from the detection cache, else the warm server, else in-process"""
+    stats = stats if stats is not None else {}
+    cache = None
+    if use_cache and not os.environ.get(NO_CACHE_ENV):
+        cache = DetectionCache(f"{detector_fingerprint()}:{tier}")
+        cached = cache.get(text)
+        if cached is not None:
+            print("Using cached detection results", file=sys.stderr)
+            stats.update({'tier': tier, 'cached': True})
+            return cached
+
+    response = request_detection(text, tier, parallel)
+    if response is not None:
+        pii_entities, business_entities = response['pii'], response['business']
+        stats.update(response.get('stats', {}))
+    else:
+        pii_entities, business_entities = detect_entities_local(text, tier, stats, parallel)
+
+    if cache is not None:
+        cache.put(text, pii_entities, business_entities)
+    return pii_entities, business_entities
+
+
+def detect_entities_incremental(text: str, document: str, tier: str = 'full', stats: Dict = None,
+                                parallel: bool = False, use_cache: bool = True) -> Tuple[List[Dict], List[Dict]]:
+    """Re-detect only the paragraphs of document that changed since its last incremental run.
+
+    Entities of unchanged paragraphs (same hash, wherever they moved) are reused
+    with their offsets shifted; new or edited paragraphs are joined by blank lines
+    and detected in one pass. Results are those of detecting each paragraph on its
+    own: an entity spanning a blank line is not found. Without use_cache this is
+    plain full detection and no paragraph state is read or written.
+    """
+    stats = stats if stats is not None else {}
+    if not use_cache or os.environ.get(NO_CACHE_ENV):
+        return detect_entities(text, use_cache=False, tier=tier, stats=stats, parallel=parallel)
+
+    store = ParagraphStore(document, f"{detector_fingerprint()}:{tier}")
+    known = store.load()
+    paragraphs = [(ParagraphStore.paragraph_key(text[start:end]), start, end)
+                  for start, end in iter_paragraphs(text) if end > start]
+
+    keys, starts, parts, length = [], [], [], 0
+    for key, start, end in paragraphs:
+        if key in known:
+            continue
+        known[key] = None  # detected below; also skips repeats of this paragraph
+        keys.append(key)
+        starts.append(length)
+        parts.append(text[start:end])
+        length += end - start + 2
+    if parts:
+        pii_entities, business_entities = detect_entities(
+            '\n\n'.join(parts), use_cache=False, tier=tier, stats=stats, parallel=parallel)
+        detected = {key: ([], []) for key in keys}
+        for slot, entities in enumerate((pii_entities, business_entities)):
+            for entity in entities:
+                i = bisect_right(starts, entity['start']) - 1
+                offset = starts[i]
+                if entity['end'] - offset <= len(parts[i]):  # else it spans the joining blank line
+                    detected[keys[i]][slot].append(
+                        {**entity, 'start': entity['start'] - offset, 'end': entity['end'] - offset})
+        known.update(detected)
+    else:
+        stats['tier'] = tier
+
+    pii_entities, business_entities = [], []
+    for key, start, end in paragraphs:
+        pii, business = known[key]
+        pii_entities.extend({**e, 'start': e['start'] + start, 'end': e['end'] + start} for e in pii)
+        business_entities.extend({**e, 'start': e['start'] + start, 'end': e['end'] + start} for e in business)
+    store.save({key: known[key] for key, _, _ in paragraphs})
+    stats['incremental'] = {'paragraphs': len(paragraphs), 'detected': len(parts),
+                            'chars': sum(len(part) for part in parts)}
+    return pii_entities, business_entities
+
+
+def detect_all(file_path: str, use_cache: bool = True, tier: str = 'full', profile: bool = False,
+               parallel: bool = False, incremental: bool = False) -> Dict:
     """Detect all PII and business entities in a file"""
+    profiler = Profiler(profiling_enabled(profile))
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
+        with profiler.stage('read'), open(file_path, 'r', encoding='utf-8') as f:
             text = f.read()
     except Exception as e:
         return {'error': f'Failed to read file: {e}', 'file': file_path}
 
-    pii_entities = PIIDetector().detect(text)
-    business_detector = BusinessDataDetector(text=text)
-    business_entities = business_detector.detect(text)
+    stats = {}
+    with profiler.stage('detect'):
+        if incremental:
+            pii_entities, business_entities = detect_entities_incremental(text, file_path, tier, stats,
+                                                                          parallel_enabled(parallel), use_cache)
+        else:
+            pii_entities, business_entities = detect_entities(text, use_cache=use_cache, tier=tier, stats=stats,
+                                                              parallel=parallel_enabled(parallel))
+    profiler.add_detection(stats)
 
-    # Deduplicate by position
-    unique_entities = []
-    seen_positions = set()
-    for entity in sorted(pii_entities + business_entities, key=lambda x: x['start']):
-        pos_key = (entity['start'], entity['end'])
-        if pos_key not in seen_positions:
-            unique_entities.append(entity)
-            seen_positions.add(pos_key)
+    # Resolve duplicate and overlapping spans across detectors
+    with profiler.stage('dedup'):
+        unique_entities = resolve_overlaps(pii_entities + business_entities)
+    profiler.count('resolved', len(unique_entities))
 
     # Add line/column info
-    for entity in unique_entities:
-        entity['line'], entity['column'] = get_line_column(text, entity['start'])
+    with profiler.stage('line_col'):
+        line_index = LineIndex(text)
+        for entity in unique_entities:
+            entity['line'], entity['column'] = line_index.line_column(entity['start'])
 
     # Sort by severity then position
     severity_order = {'high': 0, 'medium': 1, 'low': 2}
@@ -291,14 +711,18 @@ def detect_all(file_path: str) -> Dict:
     pii_count = sum(1 for e in unique_entities if e['category'] == 'PII')
     business_count = sum(1 for e in unique_entities if e['category'] == 'BUSINESS')
 
-    return {
+    report = {
         'file': file_path,
         'total_entities': len(unique_entities),
         'by_severity': {'high': len(high_sev), 'medium': len(medium_sev), 'low': len(low_sev)},
         'by_category': {'PII': pii_count, 'BUSINESS': business_count},
         'entities': {'high_severity': high_sev, 'medium_severity': medium_sev, 'low_severity': low_sev},
         'recommendation': _get_recommendation(high_sev, medium_sev, low_sev),
+        'detection': stats,
     }
+    if profiler.enabled:
+        report['profile'] = profiler.report()
+    return report
 
 
 def _get_recommendation(high, medium, low) -> str:
@@ -340,25 +764,152 @@ def format_report(report: Dict) -> str:
             lines.append("")
 
     lines.append(f"**Recommendation:** {report['recommendation']}")
+    lines.append(format_detection_stats(report.get('detection', {})))
+    if 'profile' in report:
+        lines.append(format_profile(report['profile']))
     return '\n'.join(lines)
 
 
-def main():
-    if len(sys.argv) != 2:
-        print("Usage: python detect.py <file_path>", file=sys.stderr)
-        sys.exit(1)
+def format_detection_stats(stats: Dict) -> str:
+    line = f"**Detection:** tier {stats.get('tier', 'full')}"
+    if stats.get('cached'):
+        return line + " (cached)"
+    incremental = stats.get('incremental')
+    if incremental:
+        line += (f", incremental: {incremental['detected']}/{incremental['paragraphs']} paragraphs "
+                 f"re-detected ({incremental['chars']:,} chars)")
+    languages = stats.get('languages')
+    if languages and len(languages) > 1:
+        line += ", languages " + ", ".join(f"{lang} {chars:,} chars" for lang, chars in languages.items())
+    scope = stats.get('ner_scope')
+    if scope:
+        line += f", NER on {scope['chars']:,}/{scope['total_chars']:,} chars ({scope['regions']} regions)"
+    if stats.get('parallel'):
+        line += f", {stats['parallel']} detectors in parallel"
+    timings = stats.get('timings', {})
+    if timings:
+        line += " - " + ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in timings.items())
+    return line
+
+
+def collect_files(paths: List[str], pattern: str = '*') -> List[str]:
+    """Expand directories (recursively, matching pattern) into a sorted file list"""
+    files = []
+    for path in paths:
+        p = Path(path)
+        if p.is_dir():
+            files.extend(sorted(str(f) for f in p.rglob(pattern) if f.is_file()))
+        else:
+            files.append(path)
+    return files
+
+
+def _init_batch_worker():
+    # The detection server is single-threaded: N workers would just queue behind it.
+    # Each worker loads its own models once and reuses them for every document it gets.
+    os.environ[NO_SERVER_ENV] = '1'
+
+
+def detect_batch(files: List[str], jobs: int = None, use_cache: bool = True, tier: str = 'full',
+                 profile: bool = False, incremental: bool = False):
+    """Yield detect_all() reports in input order, fanning files out over a process pool"""
+    detect_file = partial(detect_all, use_cache=use_cache, tier=tier, profile=profile, incremental=incremental)
+    jobs = max(1, min(jobs or os.cpu_count() or 1, len(files)))
+    if jobs == 1:
+        yield from map(detect_file, files)
+        return
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_batch_worker) as pool:
+        yield from pool.map(detect_file, files)
+
+
+def summarize_batch(reports: List[Dict]) -> Dict:
+    summary = {
+        'files': len(reports),
+        'errors': 0,
+        'files_with_entities': 0,
+        'total_entities': 0,
+        'by_severity': {'high': 0, 'medium': 0, 'low': 0},
+        'by_category': {'PII': 0, 'BUSINESS': 0},
+        'high_severity_files': [],
+    }
+    for report in reports:
+        if 'error' in report:
+            summary['errors'] += 1
+            continue
+        if report['total_entities']:
+            summary['files_with_entities'] += 1
+        summary['total_entities'] += report['total_entities']
+        for key in summary['by_severity']:
+            summary['by_severity'][key] += report['by_severity'][key]
+        for key in summary['by_category']:
+            summary['by_category'][key] += report['by_category'][key]
+        if report['by_severity']['high']:
+            summary['high_severity_files'].append(report['file'])
+    return summary
+
+
+def format_batch_summary(summary: Dict) -> str:
+    lines = [
+        "## Batch Detection Summary",
+        "",
+        f"**Files:** {summary['files']} ({summary['files_with_entities']} with entities, {summary['errors']} errors)",
+        f"**Total Entities:** {summary['total_entities']}",
+        f"**By Severity:** High: {summary['by_severity']['high']}, Medium: {summary['by_severity']['medium']}, "
+        f"Low: {summary['by_severity']['low']}",
+        f"**By Category:** PII: {summary['by_category']['PII']}, Business: {summary['by_category']['BUSINESS']}",
+    ]
+    if summary['high_severity_files']:
+        lines.append("")
+        lines.append("### Files with High Severity Data")
+        lines.extend(f"- {f}" for f in summary['high_severity_files'])
+    return '\n'.join(lines)
 
-    file_path = sys.argv[1]
-    if not Path(file_path).exists():
-        print(f"Error: File not found: {file_path}", file=sys.stderr)
-        sys.exit(1)
 
-    print(f"Detecting PII and business data in: {file_path}", file=sys.stderr)
-    report = detect_all(file_path)
+def main():
+    parser = argparse.ArgumentParser(description='Detect PII and business data in text files')
+    parser.add_argument('paths', nargs='+', help='File(s) or directories to scan')
+    parser.add_argument('--jobs', type=int, default=None,
+                        help='Worker processes in batch mode (default: CPU count)')
+    parser.add_argument('--glob', default='*', help="File pattern inside directories (default: '*')")
+    parser.add_argument('--no-cache', action='store_true', help='Ignore and do not write the detection cache')
+    parser.add_argument('--tier', choices=TIERS, default='full',
+                        help='regex: no NER; auto: NER only on paragraphs likely to hold entities; full (default)')
+    parser.add_argument('--profile', action='store_true',
+                        help='Add per-stage timings, entity counts and peak RSS to the report')
+    parser.add_argument('--parallel', action='store_true',
+                        help='Single file: run Scrubadub, NER and the regex patterns in parallel processes')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Re-detect only paragraphs changed since the last --incremental run on the file')
+    args = parser.parse_args()
+
+    for path in args.paths:
+        if not Path(path).exists():
+            print(f"Error: File not found: {path}", file=sys.stderr)
+            sys.exit(1)
 
-    print(json.dumps(report, indent=2))
+    if len(args.paths) == 1 and Path(args.paths[0]).is_file():
+        file_path = args.paths[0]
+        print(f"Detecting PII and business data in: {file_path}", file=sys.stderr)
+        report = detect_all(file_path, use_cache=not args.no_cache, tier=args.tier, profile=args.profile,
+                            parallel=args.parallel, incremental=args.incremental)
+
+        print(json.dumps(report, indent=2))
+        print("\n" + "=" * 60, file=sys.stderr)
+        print(format_report(report), file=sys.stderr)
+        print("=" * 60, file=sys.stderr)
+        return
+
+    files = collect_files(args.paths, args.glob)
+    print(f"Detecting PII and business data in {len(files)} files", file=sys.stderr)
+    reports = []
+    for report in detect_batch(files, args.jobs, use_cache=not args.no_cache, tier=args.tier,
+                               profile=args.profile, incremental=args.incremental):
+        reports.append({k: v for k, v in report.items() if k != 'entities'})  # summary needs counts only
+        print(json.dumps(report), flush=True)
+    summary = summarize_batch(reports)
+    print(json.dumps({'summary': summary}))
     print("\n" + "=" * 60, file=sys.stderr)
-    print(format_report(report), file=sys.stderr)
+    print(format_batch_summary(summary), file=sys.stderr)
     print("=" * 60, file=sys.stderr)
 
 
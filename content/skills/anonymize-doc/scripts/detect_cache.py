@@ -0,0 +1,142 @@
+"""
+On-disk detection cache for anonymize-doc
+
+detect.py usually runs first for review and anonymize.py then detects the
+same text again (and again for every --strategy tried). Raw detector output
+is cached per document so those re-runs skip detection entirely.
+
+Key: SHA-256 of the detector fingerprint (code, pattern tables, library and
+model versions) plus the document text, so any upgrade or pattern edit
+invalidates old entries. Entries hold detected values, so files are
+owner-only; the oldest-used entries are evicted once the cache exceeds its
+size cap.
+
+ParagraphStore keeps, per document path, the entities of each paragraph of
+the last incremental run (keyed by paragraph hash), in the same directory and
+under the same size cap.
+"""
+
+import os
+import json
+import hashlib
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+CACHE_DIR_ENV = 'ANONYMIZE_DOC_CACHE_DIR'
+CACHE_MAX_MB_ENV = 'ANONYMIZE_DOC_CACHE_MAX_MB'
+NO_CACHE_ENV = 'ANONYMIZE_DOC_NO_CACHE'
+DEFAULT_MAX_MB = 256
+
+
+def default_cache_dir() -> Path:
+    if os.environ.get(CACHE_DIR_ENV):
+        return Path(os.environ[CACHE_DIR_ENV])
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return Path(base) / 'anonymize-doc' / 'detections'
+
+
+def default_max_bytes() -> int:
+    return int(float(os.environ.get(CACHE_MAX_MB_ENV, DEFAULT_MAX_MB)) * 1024 * 1024)
+
+
+def evict(cache_dir: Path, max_bytes: int):
+    """Delete least recently used entries until cache_dir fits in max_bytes"""
+    entries = []
+    total = 0
+    for path in cache_dir.glob('*.json'):
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+        total += stat.st_size
+    if total <= max_bytes:
+        return
+    for _, size, path in sorted(entries):
+        try:
+            path.unlink()
+        except OSError:
+            continue
+        total -= size
+        if total <= max_bytes:
+            break
+
+
+class DetectionCache:
+    """Maps document text -> (pii_entities, business_entities) on disk"""
+
+    def __init__(self, fingerprint: str, cache_dir: Path = None, max_bytes: int = None):
+        self.fingerprint = fingerprint
+        self.cache_dir = Path(cache_dir) if cache_dir else default_cache_dir()
+        self.max_bytes = default_max_bytes() if max_bytes is None else max_bytes
+
+    def key(self, text: str) -> str:
+        digest = hashlib.sha256(self.fingerprint.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(text.encode('utf-8', 'surrogatepass'))
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, text: str) -> Optional[Tuple[List[Dict], List[Dict]]]:
+        path = self._path(self.key(text))
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            os.utime(path)  # mark as recently used for eviction
+            return entry['pii'], entry['business']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def put(self, text: str, pii_entities: List[Dict], business_entities: List[Dict]):
+        """Store an entry; cache failures never break detection"""
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True, mode=0o700)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')  # created 0600
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'pii': pii_entities, 'business': business_entities}, f)
+            os.replace(tmp_path, self._path(self.key(text)))
+            self.evict()
+        except OSError:
+            pass
+
+    def evict(self):
+        evict(self.cache_dir, self.max_bytes)
+
+
+class ParagraphStore:
+    """Paragraph hash -> (pii_entities, business_entities) of one document, offsets relative to the paragraph"""
+
+    def __init__(self, document: str, fingerprint: str, cache_dir: Path = None, max_bytes: int = None):
+        self.cache_dir = Path(cache_dir) if cache_dir else default_cache_dir()
+        self.max_bytes = default_max_bytes() if max_bytes is None else max_bytes
+        digest = hashlib.sha256(fingerprint.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(os.path.abspath(document).encode('utf-8', 'surrogatepass'))
+        self.path = self.cache_dir / f"{digest.hexdigest()}.paragraphs.json"
+
+    @staticmethod
+    def paragraph_key(text: str) -> str:
+        return hashlib.sha256(text.encode('utf-8', 'surrogatepass')).hexdigest()
+
+    def load(self) -> Dict[str, Tuple[List[Dict], List[Dict]]]:
+        """Entities by paragraph key from the last run; empty when there is none"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return {key: (pii, business) for key, (pii, business) in json.load(f)['paragraphs'].items()}
+        except (OSError, ValueError, KeyError, TypeError):
+            return {}
+
+    def save(self, paragraphs: Dict[str, Tuple[List[Dict], List[Dict]]]):
+        """Replace the stored paragraphs; failures never break detection"""
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True, mode=0o700)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')  # created 0600
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'paragraphs': paragraphs}, f)
+            os.replace(tmp_path, self.path)
+            evict(self.cache_dir, self.max_bytes)
+        except OSError:
+            pass
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Detection Server for anonymize-doc
+
+Keeps the Scrubadub scrubber and the per-language spaCy pipelines loaded
+between runs, so detect.py and anonymize.py skip the multi-second model load
+on every call.
+
+Protocol: JSON-lines over a Unix socket (one request object per line, one
+response object per line). Requests:
+    {"op": "ping"}
+    {"op": "detect", "text": "...", "tier": "full", "parallel": false}
+    {"op": "shutdown"}
+
+Usage:
+    python detect_server.py start [--socket PATH]   # runs in the foreground
+    python detect_server.py status [--socket PATH]
+    python detect_server.py stop [--socket PATH]
+
+detect.py and anonymize.py use the server automatically when its socket
+answers, and fall back to in-process detection otherwise.
+Set ANONYMIZE_DOC_NO_SERVER=1 to always detect in-process.
+"""
+
+import sys
+import os
+import json
+import stat
+import socket
+import socketserver
+import argparse
+from pathlib import Path
+from typing import Dict, Optional
+
+SOCKET_ENV = 'ANONYMIZE_DOC_SOCKET'
+NO_SERVER_ENV = 'ANONYMIZE_DOC_NO_SERVER'
+CLIENT_TIMEOUT = 300  # seconds; large documents take a while even on warm models
+
+
+def default_socket_path() -> str:
+    """Socket path: $ANONYMIZE_DOC_SOCKET, else per-user runtime dir, else a private dir in /tmp"""
+    if os.environ.get(SOCKET_ENV):
+        return os.environ[SOCKET_ENV]
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return os.path.join(runtime_dir, 'anonymize-doc.sock')
+    return os.path.join('/tmp', f'anonymize-doc-{os.getuid()}', 'detect.sock')
+
+
+def check_private(socket_path: str) -> Optional[str]:
+    """Why the socket cannot be trusted with documents, or None when it can: the socket must be
+    ours and owner-only, and its directory ours and not writable by others (so it cannot be
+    swapped). Another local user could otherwise receive every document and answer 'no entities'."""
+    uid = os.getuid()
+    for path, forbidden in ((os.path.dirname(os.path.abspath(socket_path)), 0o022), (socket_path, 0o077)):
+        try:
+            st = os.lstat(path)
+        except OSError as e:
+            return str(e)
+        if st.st_uid != uid:
+            return f"{path} is owned by uid {st.st_uid}, not {uid}"
+        if stat.S_IMODE(st.st_mode) & forbidden:
+            return f"{path} has mode {stat.S_IMODE(st.st_mode):o}, accessible to other users"
+    return None
+
+
+def _send(request: Dict, socket_path: str, timeout: float) -> Dict:
+    """Send one request line and read one response line. Raises OSError/ValueError on failure."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+        with sock.makefile('rb') as stream:
+            line = stream.readline()
+    if not line:
+        raise ValueError('server closed the connection without a response')
+    return json.loads(line)
+
+
+def request_detection(text: str, tier: str = 'full', parallel: bool = False,
+                      socket_path: str = None) -> Optional[Dict]:
+    """Detect via a running server. Returns None when no server is usable (caller falls back)."""
+    if os.environ.get(NO_SERVER_ENV) or not hasattr(socket, 'AF_UNIX'):
+        return None
+    socket_path = socket_path or default_socket_path()
+    if not os.path.exists(socket_path):
+        return None
+    problem = check_private(socket_path)
+    if problem:
+        print(f"Detection server socket not trusted ({problem}), detecting in-process", file=sys.stderr)
+        return None
+    try:
+        response = _send({'op': 'detect', 'text': text, 'tier': tier, 'parallel': parallel}, socket_path, CLIENT_TIMEOUT)
+    except (OSError, ValueError) as e:
+        print(f"Detection server unavailable ({e}), detecting in-process", file=sys.stderr)
+        return None
+    if not response.get('ok'):
+        print(f"Detection server error: {response.get('error')}, detecting in-process", file=sys.stderr)
+        return None
+    return response
+
+
+class _DetectionHandler(socketserver.StreamRequestHandler):
+    """Serves JSON-lines requests until the client closes the connection"""
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                response = self.server.dispatch(json.loads(line))
+            except SystemExit:  # a loader's exit on a missing model/package (hint is on the server's stderr)
+                response = {'ok': False, 'error': 'missing model or package, see the server log'}
+            except Exception as e:  # keep serving: one bad request must not kill warm models
+                response = {'ok': False, 'error': f'{type(e).__name__}: {e}'}
+            self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+            self.wfile.flush()
+
+
+class DetectionServer(socketserver.UnixStreamServer):
+    """Single-threaded on purpose: spaCy pipelines are not safe to share across threads"""
+
+    def __init__(self, socket_path: str):
+        # Imported here so clients (detect.py, anonymize.py) never pay for it
+        import detect
+        self.detect = detect
+        self.socket_path = socket_path
+        previous_umask = os.umask(0o177)  # documents are sensitive: owner only, from bind() on
+        try:
+            super().__init__(socket_path, _DetectionHandler)
+        finally:
+            os.umask(previous_umask)
+
+    def warm_up(self, languages):
+        self.detect.get_pii_detector()
+        for lang in languages:
+            self.detect.get_language_detector(lang)
+
+    def dispatch(self, request: Dict) -> Dict:
+        op = request.get('op')
+        if op == 'ping':
+            return {'ok': True, 'pid': os.getpid(), 'languages': sorted(self.detect._model_pool.languages())}
+        if op == 'detect':
+            stats = {}
+            pii_entities, business_entities = self.detect.detect_entities_local(
+                request['text'], request.get('tier', 'full'), stats, request.get('parallel', False))
+            return {'ok': True, 'pii': pii_entities, 'business': business_entities, 'stats': stats}
+        if op == 'shutdown':
+            # shutdown() blocks until serve_forever returns, so it must run off this thread
+            import threading
+            threading.Thread(target=self.shutdown, daemon=True).start()
+            return {'ok': True}
+        return {'ok': False, 'error': f'unknown op: {op}'}
+
+
+def _ping(socket_path: str) -> Optional[Dict]:
+    try:
+        return _send({'op': 'ping'}, socket_path, timeout=2)
+    except (OSError, ValueError):
+        return None
+
+
+def start(socket_path: str, languages) -> int:
+    os.makedirs(os.path.dirname(os.path.abspath(socket_path)), mode=0o700, exist_ok=True)
+    if os.path.exists(socket_path):
+        if _ping(socket_path):
+            print(f"Error: server already running on {socket_path}", file=sys.stderr)
+            return 1
+        os.unlink(socket_path)  # stale socket from a crashed server
+
+    server = DetectionServer(socket_path)
+    problem = check_private(socket_path)
+    if problem:
+        server.server_close()
+        os.unlink(socket_path)
+        print(f"Error: clients would not trust the socket: {problem}", file=sys.stderr)
+        return 1
+    try:
+        server.warm_up(languages)
+        print(f"Detection server ready on {socket_path} (pid {os.getpid()})", file=sys.stderr)
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Keep anonymize-doc detection models loaded between runs')
+    parser.add_argument('command', choices=['start', 'status', 'stop'])
+    parser.add_argument('--socket', default=None, help='Unix socket path (default: per-user runtime dir)')
+    parser.add_argument('--languages', default='en',
+                        help='Comma-separated languages to preload on start (default: en)')
+    args = parser.parse_args()
+
+    socket_path = args.socket or default_socket_path()
+
+    if args.command == 'start':
+        languages = [lang.strip() for lang in args.languages.split(',') if lang.strip()]
+        sys.exit(start(socket_path, languages))
+
+    info = _ping(socket_path) if Path(socket_path).exists() else None
+    if args.command == 'status':
+        if info:
+            print(json.dumps({'running': True, 'socket': socket_path, **info}, indent=2))
+        else:
+            print(json.dumps({'running': False, 'socket': socket_path}, indent=2))
+            sys.exit(1)
+        return
+
+    if not info:
+        print(f"No server running on {socket_path}", file=sys.stderr)
+        sys.exit(1)
+    _send({'op': 'shutdown'}, socket_path, timeout=5)
+    print(f"Stopped detection server (pid {info['pid']})", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
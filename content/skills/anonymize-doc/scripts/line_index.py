@@ -0,0 +1,27 @@
+"""
+Line/column lookup for character offsets
+
+Re-splitting the text up to the position on every call is quadratic when it
+runs once per entity. LineIndex records where each line
+starts once per text and answers every lookup with a binary search.
+"""
+
+from bisect import bisect_right
+from typing import Tuple
+
+
+class LineIndex:
+    """Offsets of line starts in a text, for O(log n) position -> (line, column)"""
+
+    def __init__(self, text: str):
+        starts = [0]
+        pos = text.find('\n')
+        while pos != -1:
+            starts.append(pos + 1)
+            pos = text.find('\n', pos + 1)
+        self.line_starts = starts
+
+    def line_column(self, position: int) -> Tuple[int, int]:
+        """1-based (line, column) of position"""
+        line = bisect_right(self.line_starts, position)
+        return line, position - self.line_starts[line - 1] + 1
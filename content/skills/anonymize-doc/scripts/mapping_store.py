@@ -0,0 +1,97 @@
+"""
+Persistent replacement mappings for anonymize-doc
+
+Pseudonyms and tokens are stored per (entity type, normalized original,
+strategy), so the same person, company or email gets the same replacement
+everywhere it appears: within a document, across a corpus and across runs.
+Backed by SQLite (stdlib); without a path the store lives in memory and only
+spans one run.
+
+The store maps replacements back to originals: treat the file like an audit
+log (owner-only permissions, never committed).
+"""
+
+import os
+import sqlite3
+from typing import Dict, Iterator, Optional, Tuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS mappings (
+    entity_type TEXT NOT NULL,
+    normalized  TEXT NOT NULL,
+    strategy    TEXT NOT NULL,
+    original    TEXT NOT NULL,
+    replacement TEXT NOT NULL,
+    PRIMARY KEY (entity_type, normalized, strategy)
+);
+CREATE INDEX IF NOT EXISTS mappings_by_replacement ON mappings (strategy, replacement);
+"""
+
+
+def normalize(text: str) -> str:
+    """Case- and whitespace-insensitive key: 'John  SMITH' and 'john smith' share a pseudonym"""
+    return ' '.join(text.split()).casefold()
+
+
+class MappingStore:
+    """(entity type, original, strategy) -> replacement, persisted in SQLite"""
+
+    def __init__(self, path: str = None):
+        """Open (or create) the store. Raises OSError when path is not a usable SQLite database."""
+        self.path = path
+        conn = None
+        try:
+            if path:
+                existed = os.path.exists(path)
+                conn = sqlite3.connect(path)
+                if not existed:
+                    os.chmod(path, 0o600)
+            else:
+                conn = sqlite3.connect(':memory:')
+            conn.executescript(_SCHEMA)  # also where a file that is not a database fails
+        except sqlite3.Error as e:
+            if conn is not None:
+                conn.close()
+            raise OSError(f"{path}: {e}") from e
+        self.conn = conn
+        self._cache: Dict[Tuple[str, str, str], str] = {}
+
+    def get(self, entity_type: str, original: str, strategy: str) -> Optional[str]:
+        key = (entity_type, normalize(original), strategy)
+        if key not in self._cache:
+            row = self.conn.execute(
+                'SELECT replacement FROM mappings WHERE entity_type = ? AND normalized = ? AND strategy = ?',
+                key).fetchone()
+            if row is None:
+                return None
+            self._cache[key] = row[0]
+        return self._cache[key]
+
+    def is_taken(self, strategy: str, replacement: str) -> bool:
+        """Whether another original already maps to this replacement (keeps reversal unambiguous)"""
+        row = self.conn.execute(
+            'SELECT 1 FROM mappings WHERE strategy = ? AND replacement = ? LIMIT 1',
+            (strategy, replacement)).fetchone()
+        return row is not None
+
+    def put(self, entity_type: str, original: str, strategy: str, replacement: str) -> str:
+        """Record a mapping; returns the stored replacement (an existing one wins)"""
+        key = (entity_type, normalize(original), strategy)
+        self.conn.execute('INSERT OR IGNORE INTO mappings VALUES (?, ?, ?, ?, ?)',
+                          (*key, original, replacement))
+        self._cache.pop(key, None)
+        return self.get(entity_type, original, strategy)
+
+    def iter_mappings(self) -> Iterator[Tuple[str, str, str, str]]:
+        """(entity_type, original, strategy, replacement) for every stored mapping"""
+        yield from self.conn.execute('SELECT entity_type, original, strategy, replacement FROM mappings')
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
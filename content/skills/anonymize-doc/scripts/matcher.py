@@ -0,0 +1,149 @@
+"""
+Single-pass pattern matching for BusinessDataDetector
+
+Running re.finditer once per pattern rescans the document for every entry in
+NAME_PATTERNS, FINANCIAL_PATTERNS and DEPARTMENTS. The scanners here find the
+same matches with far fewer passes:
+
+- KeywordScanner compiles a keyword list into one prefix-trie alternation, an
+  Aho-Corasick style automaton that runs inside the regex engine, and scans
+  the text once.
+- PatternScanner shares one scan among patterns that start with the same
+  leading group (e.g. the currency-led financial patterns) and checks each
+  pattern only where that head matches. Patterns with a unique head keep
+  their own pass: merging them into one alternation measured slower, because
+  the regex engine then tries every branch at every position.
+
+Both yield exactly what the equivalent per-pattern re.finditer loops yield,
+in the same order: grouped by pattern (in list order), then by position.
+"""
+
+import re
+from typing import Dict, Iterator, List, Tuple
+
+# Leading parenthesized group of a pattern source, e.g. '(\$|€|£|USD|EUR|GBP)'
+_HEAD_RE = re.compile(r'\((?:[^()\\]|\\.)*\)')
+
+
+def trie_pattern(keywords: List[str], lower: bool = True) -> str:
+    """Compile keywords into a prefix-factored alternation (longest alternative first)"""
+    root: Dict = {}
+    for keyword in keywords:
+        node = root
+        for ch in keyword.lower() if lower else keyword:
+            node = node.setdefault(ch, {})
+        node[''] = {}
+
+    def emit(node: Dict) -> str:
+        branches = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return f'(?:{body})?' if '' in node else body
+
+    return emit(root)
+
+
+def _hit_positions(finder: re.Pattern, text: str) -> Iterator[int]:
+    """Every position where finder matches, including positions inside an earlier match"""
+    pos = 0
+    while True:
+        m = finder.search(text, pos)
+        if not m:
+            return
+        yield m.start()
+        pos = m.start() + 1
+
+
+def _non_overlapping(matches: List[re.Match]) -> List[re.Match]:
+    """Keep matches the way re.finditer would: each starts at or after the previous end"""
+    kept = []
+    last_end = 0
+    for m in matches:
+        if m.start() >= last_end and m.end() > m.start():
+            kept.append(m)
+            last_end = m.end()
+    return kept
+
+
+class PatternScanner:
+    """Runs many (key, pattern, flags) regexes over a text in as few passes as possible"""
+
+    def __init__(self, patterns: List[Tuple[str, str, int]]):
+        self.patterns = [(key, re.compile(pattern, flags)) for key, pattern, flags in patterns]
+
+        heads: Dict[Tuple[str, int], List[int]] = {}
+        for i, (_, pattern, flags) in enumerate(patterns):
+            head = _HEAD_RE.match(pattern)
+            if head:
+                heads.setdefault((head.group(0), flags), []).append(i)
+
+        # pattern index -> (finder, indices sharing it); only heads used by 2+ patterns
+        self._shared: Dict[int, Tuple[re.Pattern, List[int]]] = {}
+        for (head, flags), indices in heads.items():
+            if len(indices) > 1:
+                group = (re.compile(head, flags), indices)
+                for i in indices:
+                    self._shared[i] = group
+
+    def finditer(self, text: str) -> Iterator[Tuple[str, re.Match]]:
+        """Yield (key, match) exactly like `for key, p in patterns: for m in re.finditer(p, text)`"""
+        shared_matches: Dict[int, List[re.Match]] = {}
+        for i, (_, compiled) in enumerate(self.patterns):
+            if i in self._shared and i not in shared_matches:
+                finder, indices = self._shared[i]
+                candidates = {j: [] for j in indices}
+                for pos in _hit_positions(finder, text):
+                    for j in indices:
+                        m = self.patterns[j][1].match(text, pos)
+                        if m:
+                            candidates[j].append(m)
+                for j in indices:
+                    shared_matches[j] = _non_overlapping(candidates[j])
+
+            key = self.patterns[i][0]
+            if i in shared_matches:
+                for m in shared_matches.pop(i):
+                    yield key, m
+            else:
+                for m in compiled.finditer(text):
+                    yield key, m
+
+
+class KeywordScanner:
+    """Finds whole-word, case-insensitive keyword occurrences in a single pass"""
+
+    def __init__(self, keywords: List[str]):
+        self.keywords = list(keywords)
+        self._compiled = [re.compile(r'\b' + re.escape(k) + r'\b', re.IGNORECASE) for k in self.keywords]
+        self._finder = re.compile(r'\b(?:' + trie_pattern(self.keywords) + r')\b', re.IGNORECASE)
+        self._index = {k.lower(): i for i, k in enumerate(self.keywords)}
+        # Shorter keywords that can match at the same position as a longer one
+        self._prefixes = {
+            i: [j for j, other in enumerate(self.keywords)
+                if j != i and k.lower().startswith(other.lower())]
+            for i, k in enumerate(self.keywords)
+        }
+
+    def finditer(self, text: str) -> Iterator[Tuple[str, re.Match]]:
+        """Yield (keyword, match) exactly like `for k in keywords: for m in re.finditer(r'\\bk\\b', text, re.I)`"""
+        per_keyword: List[List[re.Match]] = [[] for _ in self.keywords]
+        for pos in _hit_positions(self._finder, text):
+            found = self._finder.match(text, pos)
+            i = self._index.get(found.group(0).lower())
+            if i is None:
+                # Case folding the regex engine accepts but str.lower() maps differently
+                candidates = range(len(self.keywords))
+            else:
+                per_keyword[i].append(found)
+                candidates = self._prefixes[i]
+            for j in candidates:
+                if j == i:
+                    continue
+                m = self._compiled[j].match(text, pos)
+                if m:
+                    per_keyword[j].append(m)
+
+        for keyword, matches in zip(self.keywords, per_keyword):
+            for m in _non_overlapping(matches):
+                yield keyword, m
@@ -0,0 +1,87 @@
+"""
+Opt-in stage profiling for anonymize-doc
+
+Enabled with --profile (detect.py, anonymize.py) or ANONYMIZE_DOC_PROFILE=1.
+Records wall time per stage, entity counts per detector and the process's
+peak RSS, so slow runs can be attributed to model loading, Scrubadub, NER or
+the regex passes without an external profiler.
+
+Detection stages come from the process that ran them: with the detection
+server, model_load/ner are the server's, and peak RSS is only this process.
+"""
+
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+PROFILE_ENV = 'ANONYMIZE_DOC_PROFILE'
+
+
+def profiling_enabled(flag: bool = False) -> bool:
+    return flag or bool(os.environ.get(PROFILE_ENV))
+
+
+@contextmanager
+def timed(timings: Dict, stage: str):
+    """Add the wall time of the block to timings[stage] (seconds, accumulated)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = round(timings.get(stage, 0) + time.perf_counter() - start, 4)
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process, or None where resource is unavailable (Windows)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)  # bytes on macOS, KB elsewhere
+
+
+class Profiler:
+    """Stage timings and entity counts for one file; a disabled profiler records nothing"""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.stages: Dict[str, float] = {}
+        self.entities: Dict[str, int] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        if not self.enabled:
+            yield
+            return
+        with timed(self.stages, name):
+            yield
+
+    def count(self, name: str, n: int):
+        if self.enabled:
+            self.entities[name] = n
+
+    def add_detection(self, stats: Dict):
+        """Fold detect_entities() stats in: its timings become detect.<stage>"""
+        if not self.enabled:
+            return
+        for stage, seconds in stats.get('timings', {}).items():
+            self.stages[f'detect.{stage}'] = seconds
+        self.entities.update(stats.get('entities', {}))
+
+    def report(self) -> Dict:
+        return {
+            'stages': dict(self.stages),
+            'entities': dict(self.entities),
+            'peak_rss_mb': peak_rss_mb(),
+        }
+
+
+def format_profile(profile: Dict) -> str:
+    stages = sorted(profile['stages'].items(), key=lambda item: -item[1])
+    line = "**Profile:** " + ", ".join(f"{stage} {seconds:.3f}s" for stage, seconds in stages)
+    if profile.get('peak_rss_mb') is not None:
+        line += f"; peak RSS {profile['peak_rss_mb']:,.1f} MB"
+    return line
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Restore originals in anonymized text (de-pseudonymize)
+
+Maps pseudonyms and tokens back to the originals recorded in audit logs
+and/or a mapping store, e.g. when an LLM's answer about an anonymized
+document comes back quoting pseudonyms. Only pseudo and token replacements
+are reversible; masked and hashed values stay as they are.
+
+All replacements are compiled into one prefix-trie regex (matcher.trie_pattern),
+so the text is scanned once whatever the number of mappings. Input is read
+in chunks: text is emitted up to a safe point (twice the longest
+replacement's length before the buffer end), so memory stays bounded on
+large outputs.
+
+Usage:
+    python restore.py <anonymized_file|-> --audit-log <log> [--audit-log <log> ...]
+                      [--mapping-store <mappings.db>] [-o <output>]
+"""
+
+import io
+import os
+import re
+import sys
+import sqlite3
+import argparse
+import tempfile
+from typing import Dict, Iterable, Iterator, Tuple
+
+from matcher import trie_pattern
+from audit_log import iter_mappings, REVERSIBLE_STRATEGIES
+from mapping_store import MappingStore
+
+CHUNK_CHARS = 1_000_000
+
+
+class Restorer:
+    """replacement -> original index with single-pass, streaming substitution"""
+
+    def __init__(self):
+        self.index: Dict[str, str] = {}
+        self.conflicts: Dict[str, set] = {}
+        self._pattern = None
+
+    def add(self, replacement: str, original: str):
+        """Register a mapping; a replacement claimed by two originals keeps the first"""
+        if not replacement:
+            return
+        known = self.index.setdefault(replacement, original)
+        if known != original:
+            self.conflicts.setdefault(replacement, {known}).add(original)
+        self._pattern = None
+
+    def add_mappings(self, mappings: Iterable[Dict]):
+        for m in mappings:
+            if m.get('strategy') in REVERSIBLE_STRATEGIES:
+                self.add(m['replacement'], m['original'])
+
+    def add_store(self, store: MappingStore):
+        for _, original, strategy, replacement in store.iter_mappings():
+            if strategy in REVERSIBLE_STRATEGIES:
+                self.add(replacement, original)
+
+    @property
+    def pattern(self) -> re.Pattern:
+        """Whole replacements only ('Bob Ray5' must not fire inside 'Bob Ray55'), but adjacent
+        pieces of one split entity ('TKN_1a2bTKN_3c4d') are separate replacements"""
+        if self._pattern is None:
+            trie = trie_pattern(list(self.index), lower=False)
+            self._pattern = re.compile(f'(?:{trie})(?=\\W|\\Z|(?:{trie}))')
+        return self._pattern
+
+    def _matches(self, buffer: str, pos: int, limit: int, previous_end: int) -> Iterator[re.Match]:
+        """Pattern matches starting before limit, with the leading word boundary checked here
+        (a lookbehind cannot accept 'right after another replacement', i.e. at previous_end)"""
+        pattern = self.pattern
+        while True:
+            m = pattern.search(buffer, pos)
+            if not m or m.start() >= limit:
+                return
+            start = m.start()
+            if start > 0 and start != previous_end and (buffer[start - 1].isalnum() or buffer[start - 1] == '_'):
+                pos = start + 1
+                continue
+            yield m
+            pos = previous_end = m.end()
+
+    def restore_stream(self, src, out, chunk_chars: int = CHUNK_CHARS) -> Dict[str, int]:
+        """Copy src to out with replacements restored. Returns {original: count}."""
+        counts: Dict[str, int] = {}
+        if not self.index:
+            for chunk in iter(lambda: src.read(chunk_chars), ''):
+                out.write(chunk)
+            return counts
+
+        # A match starting before len(buffer) - margin is complete, and so is its
+        # trailing check (which may need a whole following replacement)
+        margin = 2 * max(len(r) for r in self.index) + 1
+        buffer, pos, previous_end = '', 0, -1
+        while True:
+            chunk = src.read(chunk_chars)
+            buffer += chunk
+            final = not chunk
+            limit = len(buffer) if final else len(buffer) - margin
+            for m in self._matches(buffer, pos, limit, previous_end):
+                original = self.index[m.group(0)]
+                out.write(buffer[pos:m.start()])
+                out.write(original)
+                counts[original] = counts.get(original, 0) + 1
+                pos = previous_end = m.end()
+            if final:
+                out.write(buffer[pos:])
+                return counts
+            if pos < limit:
+                out.write(buffer[pos:limit])
+                pos = limit
+            keep = max(0, pos - 1)  # one char of context for the leading boundary check
+            buffer, pos, previous_end = buffer[keep:], pos - keep, previous_end - keep
+
+    def restore_text(self, text: str) -> Tuple[str, Dict[str, int]]:
+        out = io.StringIO()
+        counts = self.restore_stream(io.StringIO(text), out)
+        return out.getvalue(), counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Restore originals in anonymized text')
+    parser.add_argument('input', help="Anonymized text file, or '-' for stdin")
+    parser.add_argument('--audit-log', action='append', default=[], metavar='PATH',
+                        help='Audit log with reversible mappings (repeatable)')
+    parser.add_argument('--mapping-store', metavar='PATH', help='SQLite mapping store from anonymize.py')
+    parser.add_argument('-o', '--output', help='Output file (default: stdout)')
+    args = parser.parse_args()
+
+    if not args.audit_log and not args.mapping_store:
+        parser.error('give at least one --audit-log or --mapping-store')
+
+    restorer = Restorer()
+    try:
+        for path in args.audit_log:
+            restorer.add_mappings(iter_mappings(path))
+        if args.mapping_store:
+            if not os.path.exists(args.mapping_store):
+                raise OSError(f"no such mapping store: {args.mapping_store}")
+            with MappingStore(args.mapping_store) as store:
+                restorer.add_store(store)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"Error: cannot load mappings: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if not restorer.index:
+        print("Warning: no reversible (pseudo/token) mappings found; output is unchanged", file=sys.stderr)
+    for replacement, originals in restorer.conflicts.items():
+        print(f"Warning: '{replacement}' maps to {len(originals)} originals; restoring the first "
+              f"('{restorer.index[replacement]}')", file=sys.stderr)
+
+    # -o is written to a temporary file (owner-only: it holds originals) and renamed into place
+    # on success, so an input that fails mid-stream never leaves a partial or truncated output
+    tmp_output = None
+    try:
+        src = sys.stdin if args.input == '-' else open(args.input, 'r', encoding='utf-8')
+        out = sys.stdout
+        try:
+            if args.output:
+                fd, tmp_output = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(args.output)), suffix='.tmp')
+                out = os.fdopen(fd, 'w', encoding='utf-8')
+            counts = restorer.restore_stream(src, out)
+        finally:
+            if src is not sys.stdin:
+                src.close()
+            if out is not sys.stdout:
+                out.close()
+        if tmp_output:
+            os.replace(tmp_output, args.output)
+            tmp_output = None
+    except (OSError, UnicodeDecodeError) as e:
+        print(f"Error: cannot restore {args.input}: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if tmp_output:
+            os.unlink(tmp_output)
+
+    print(f"Restored {sum(counts.values())} occurrences of {len(counts)} originals "
+          f"({len(restorer.index)} mappings loaded)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
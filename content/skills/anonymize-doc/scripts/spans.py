@@ -0,0 +1,117 @@
+"""
+Overlap resolution for detected entities
+
+Detectors run independently, so their spans can coincide, nest or straddle
+(a spaCy ORG running into a regex REVENUE span). resolve_overlaps() turns
+them into non-overlapping entities in O(k log k):
+
+1. Rank every entity: severity first, then specificity (typed detectors
+   beat generic NER labels), then length, then position.
+2. Accept entities in rank order into a sorted index of disjoint intervals
+   (a blocked list: an insert shifts one bounded block, not the whole index).
+   A lower-ranked entity that overlaps accepted ones keeps only its uncovered
+   pieces, so text it alone flagged is never silently dropped.
+"""
+
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Optional, Tuple
+
+SEVERITY_RANK = {'high': 0, 'medium': 1, 'low': 2}
+
+# Labels coming straight from spaCy NER are less specific than patterns that
+# matched the surrounding context (REVENUE, EMAIL, ...): on a severity tie they lose.
+GENERIC_TYPES = {'COMPANY', 'PERSON_NAME', 'MONETARY_VALUE', 'DATE'}
+
+
+def _rank(item: Tuple[int, Dict]) -> Tuple:
+    index, entity = item
+    return (
+        SEVERITY_RANK.get(entity['severity'], 3),
+        entity['type'] in GENERIC_TYPES,
+        -(entity['end'] - entity['start']),
+        entity['start'],
+        index,
+    )
+
+
+class DisjointIntervals:
+    """Sorted, non-overlapping [start, end) intervals with O(log k) lookups and inserts.
+
+    Stored as blocks of at most 2 * BLOCK intervals (as in sortedcontainers), with each
+    block's last end as the top-level index; disjoint intervals sort the same by start and end.
+    """
+
+    BLOCK = 512
+
+    def __init__(self):
+        self.starts: List[List[int]] = []
+        self.ends: List[List[int]] = []
+        self.last_ends: List[int] = []
+
+    def uncovered(self, start: int, end: int) -> List[Tuple[int, int]]:
+        """Parts of [start, end) not covered by any stored interval"""
+        pieces = []
+        cursor = start
+        b = bisect_right(self.last_ends, start)  # first block with an interval ending after start
+        k = bisect_right(self.ends[b], start) if b < len(self.ends) else 0
+        while b < len(self.starts):
+            starts, ends = self.starts[b], self.ends[b]
+            while k < len(starts) and starts[k] < end:
+                if starts[k] > cursor:
+                    pieces.append((cursor, starts[k]))
+                cursor = max(cursor, ends[k])
+                k += 1
+            if k < len(starts):
+                break
+            b, k = b + 1, 0
+        if cursor < end:
+            pieces.append((cursor, end))
+        return pieces
+
+    def add(self, start: int, end: int):
+        """Insert an interval that overlaps none of the stored ones"""
+        if not self.starts:
+            self.starts.append([start])
+            self.ends.append([end])
+            self.last_ends.append(end)
+            return
+        b = min(bisect_left(self.last_ends, end), len(self.last_ends) - 1)
+        starts, ends = self.starts[b], self.ends[b]
+        k = bisect_left(ends, end)
+        starts.insert(k, start)
+        ends.insert(k, end)
+        self.last_ends[b] = ends[-1]
+        if len(starts) > 2 * self.BLOCK:
+            self.starts[b:b + 1] = [starts[:self.BLOCK], starts[self.BLOCK:]]
+            self.ends[b:b + 1] = [ends[:self.BLOCK], ends[self.BLOCK:]]
+            self.last_ends[b:b + 1] = [ends[self.BLOCK - 1], ends[-1]]
+
+
+def _piece(entity: Dict, start: int, end: int) -> Optional[Dict]:
+    """The part of entity covering [start, end), trimmed of surrounding whitespace"""
+    text = entity['text'][start - entity['start']:end - entity['start']]
+    stripped = text.strip()
+    if not any(ch.isalnum() for ch in stripped):
+        return None
+    start += len(text) - len(text.lstrip())
+    return {**entity, 'text': stripped, 'start': start, 'end': start + len(stripped)}
+
+
+def resolve_overlaps(entities: List[Dict]) -> List[Dict]:
+    """Return non-overlapping entities sorted by position (see module docstring for the policy)"""
+    accepted = DisjointIntervals()
+    resolved = []
+    for _, entity in sorted(enumerate(entities), key=_rank):
+        start, end = entity['start'], entity['end']
+        if end <= start:
+            continue
+        pieces = accepted.uncovered(start, end)
+        if pieces == [(start, end)]:
+            kept = [entity]
+        else:
+            kept = [p for p in (_piece(entity, a, b) for a, b in pieces) if p]
+        for piece in kept:
+            accepted.add(piece['start'], piece['end'])
+            resolved.append(piece)
+    resolved.sort(key=lambda e: e['start'])
+    return resolved
@@ -0,0 +1,237 @@
+"""
+Format-aware anonymization for CSV/TSV, JSON Lines, JSON and YAML
+
+Values are anonymized field by field, so structure (headers, keys, nesting,
+quoting) is never touched. Each field follows a policy:
+
+    <ENTITY_TYPE>  the whole value is that entity (e.g. email=EMAIL); no detection
+    keep           left as is (ids, enums, timestamps)
+    text           free text: detection at the requested tier (NER unless 'regex')
+    (none)         regex detection only (Scrubadub + patterns); values of
+                   FREE_TEXT_MIN_WORDS words or more are treated as text
+
+Policies match a CSV column name, or a JSON/YAML key: either the dotted path
+(user.email; list items share their parent's path) or the bare key.
+
+CSV/TSV and JSON Lines are processed record by record; JSON and YAML
+documents are loaded whole (the stdlib has no streaming JSON parser), and
+parsed before any output is opened, so --stream is refused for them.
+Detection runs per value, through the detection server when one is running;
+the detection cache (one-off keys), --parallel and --incremental do not apply.
+"""
+
+import csv
+import json
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+from detect import detect_entities, PIIDetector, BusinessDataDetector
+from profiling import Profiler, profiling_enabled
+from mapping_store import MappingStore
+from audit_log import AuditLogWriter, STRUCTURED_COLUMNS, audit_log_path as get_audit_log_path
+
+FORMATS = {
+    '.csv': 'csv', '.tsv': 'tsv',
+    '.jsonl': 'jsonl', '.ndjson': 'jsonl',
+    '.json': 'json',
+    '.yaml': 'yaml', '.yml': 'yaml',
+}
+POLICY_ACTIONS = ('keep', 'text')
+FREE_TEXT_MIN_WORDS = 4
+
+
+def format_for(file_path: str) -> str:
+    """Structured format of file_path by extension, or 'text'"""
+    return FORMATS.get(Path(file_path).suffix.lower(), 'text')
+
+
+def entity_types() -> Dict[str, Tuple[str, str]]:
+    """Entity type -> (category, severity), as the detectors report them"""
+    types = {etype: (category, severity) for etype, category, severity in BusinessDataDetector.SPACY_LABEL_MAP.values()}
+    for level, names in PIIDetector.SEVERITY_MAP.items():
+        types.update({name: ('PII', level) for name in names})
+    for name in list(BusinessDataDetector.FINANCIAL_PATTERNS) + ['DEPARTMENT']:
+        types[name] = ('BUSINESS', BusinessDataDetector._get_severity(name))
+    return types
+
+
+def parse_policies(specs: List[str]) -> Dict[str, str]:
+    """['email=EMAIL', 'notes=text'] -> {'email': 'EMAIL', 'notes': 'text'}. Raises ValueError."""
+    known = entity_types()
+    policies = {}
+    for spec in specs or []:
+        field, sep, action = spec.partition('=')
+        if not sep or not field:
+            raise ValueError(f"policy must be FIELD=ACTION, got '{spec}'")
+        if action not in POLICY_ACTIONS and action not in known:
+            raise ValueError(f"unknown policy action '{action}' for '{field}' "
+                             f"(use {', '.join(POLICY_ACTIONS)} or one of: {', '.join(sorted(known))})")
+        policies[field] = action
+    return policies
+
+
+class StructuredAnonymizer:
+    """Applies field policies and an Anonymizer to individual values; mappings go to sink"""
+
+    def __init__(self, anonymizer, sink: Callable[[Dict], None], policies: Dict[str, str] = None,
+                 tier: str = 'full'):
+        self.anonymizer = anonymizer
+        self.sink = sink
+        self.policies = policies or {}
+        self.tier = tier
+        self.types = entity_types()
+
+    def policy_for(self, field: str) -> str:
+        if field in self.policies:
+            return self.policies[field]
+        return self.policies.get(field.rsplit('.', 1)[-1])
+
+    def anonymize_value(self, value, field: str, record: int):
+        action = self.policy_for(field)
+        if value is None or isinstance(value, bool) or action == 'keep':
+            return value
+        if action in self.types:
+            text = str(value)
+            category, severity = self.types[action]
+            entities = [{'type': action, 'category': category, 'text': text,
+                         'start': 0, 'end': len(text), 'severity': severity}] if text.strip() else []
+        elif isinstance(value, str) and value.strip():
+            text = value
+            free_text = action == 'text' or len(value.split()) >= FREE_TEXT_MIN_WORDS
+            # Through the warm server when one runs; never the cache (each value would be a one-off entry)
+            pii_entities, business_entities = detect_entities(value, use_cache=False,
+                                                              tier=self.tier if free_text else 'regex')
+            entities = pii_entities + business_entities
+        else:
+            return value  # numbers and blanks need a typed policy to be replaced
+
+        if not entities:
+            return value
+        anonymized, mappings = self.anonymizer.anonymize_text(text, entities)
+        for m in mappings:
+            m['record'], m['field'] = record, field
+            self.sink(m)
+        return anonymized
+
+    def walk(self, node, record: int, path: str = ''):
+        """Anonymize every scalar of a JSON/YAML tree; keys are never changed"""
+        if isinstance(node, dict):
+            return {key: self.walk(value, record, f"{path}.{key}" if path else str(key))
+                    for key, value in node.items()}
+        if isinstance(node, list):
+            return [self.walk(item, record, path) for item in node]
+        return self.anonymize_value(node, path, record)
+
+
+def _anonymize_csv(src, out, anonymizer: StructuredAnonymizer, delimiter: str):
+    reader = csv.reader(src, delimiter=delimiter)
+    writer = csv.writer(out, delimiter=delimiter, lineterminator='\n')
+    header = next(reader, None)
+    if header is None:
+        return
+    writer.writerow(header)
+    for record, row in enumerate(reader, 1):
+        writer.writerow([anonymizer.anonymize_value(cell, header[i] if i < len(header) else str(i), record)
+                         for i, cell in enumerate(row)])
+
+
+def _anonymize_jsonl(src, out, anonymizer: StructuredAnonymizer):
+    for record, line in enumerate(src, 1):
+        if not line.strip():
+            out.write(line)
+            continue
+        out.write(json.dumps(anonymizer.walk(json.loads(line), record), ensure_ascii=False) + '\n')
+
+
+def _anonymize_json(data, out, anonymizer: StructuredAnonymizer):
+    if isinstance(data, list):
+        data = [anonymizer.walk(item, record) for record, item in enumerate(data, 1)]
+    else:
+        data = anonymizer.walk(data, 1)
+    json.dump(data, out, indent=2, ensure_ascii=False)
+    out.write('\n')
+
+
+def _anonymize_yaml(documents, out, anonymizer: StructuredAnonymizer):
+    import yaml  # optional: only YAML input needs PyYAML
+    documents = (anonymizer.walk(doc, record) for record, doc in enumerate(documents, 1))
+    yaml.safe_dump_all(documents, out, sort_keys=False, allow_unicode=True)
+
+
+def _load_whole(file_path: str, fmt: str):
+    """The parsed JSON document, or the list of YAML documents"""
+    with open(file_path, 'r', encoding='utf-8') as src:
+        if fmt == 'json':
+            return json.load(src)
+        import yaml
+        return list(yaml.safe_load_all(src))
+
+
+def anonymize_structured(file_path: str, strategy: str, fmt: str, policies: Dict[str, str] = None,
+                         mapping_store: str = None, seed: int = None, tier: str = 'full',
+                         profile: bool = False) -> Dict:
+    """Anonymize a CSV/TSV/JSONL/JSON/YAML file field by field; same outputs as anonymize_file"""
+    # Imported here: anonymize.py imports this module
+    from anonymize import Anonymizer
+
+    errors = (OSError, ValueError, csv.Error)  # ValueError covers JSON and UTF-8 decoding errors
+    if fmt == 'yaml':
+        try:
+            import yaml
+        except ImportError:
+            return {'error': 'PyYAML not installed. Run: pip install pyyaml', 'file': file_path}
+        errors += (yaml.YAMLError,)
+
+    profiler = Profiler(profiling_enabled(profile))
+    fp = Path(file_path)
+    anonymized_path = fp.parent / f"{fp.stem}-anonymized{fp.suffix}"
+    audit_log_path = get_audit_log_path(file_path)
+
+    try:
+        with profiler.stage('read'):
+            documents = _load_whole(file_path, fmt) if fmt in ('json', 'yaml') else None
+    except errors as e:
+        return {'error': f'Failed to parse {fmt} file: {e}', 'file': file_path}
+
+    try:
+        store = MappingStore(mapping_store)  # before any output exists
+    except OSError as e:
+        return {'error': f'Failed to open mapping store: {e}', 'file': file_path}
+
+    try:
+        with store, AuditLogWriter(audit_log_path, file_path, anonymized_path, strategy,
+                                   columns=STRUCTURED_COLUMNS, format=fmt) as audit:
+            with profiler.stage('anonymize'), open(anonymized_path, 'w', encoding='utf-8', newline='') as out:
+                structured = StructuredAnonymizer(Anonymizer(strategy, store=store, seed=seed), audit.write,
+                                                  policies, tier)
+                if fmt == 'json':
+                    _anonymize_json(documents, out, structured)
+                elif fmt == 'yaml':
+                    _anonymize_yaml(documents, out, structured)
+                else:
+                    with open(file_path, 'r', encoding='utf-8', newline='') as src:
+                        if fmt == 'jsonl':
+                            _anonymize_jsonl(src, out, structured)
+                        else:
+                            _anonymize_csv(src, out, structured, ',' if fmt == 'csv' else '\t')
+            profiler.count('resolved', audit.total)
+            profile_report = profiler.report() if profiler.enabled else None
+            summary = audit.close(**({'profile': profile_report} if profile_report else {}))
+    except errors as e:
+        # A bad record mid-file: drop the partial outputs rather than leave a half-anonymized file
+        for partial in (anonymized_path, Path(audit_log_path)):
+            partial.unlink(missing_ok=True)
+        return {'error': f'Failed to anonymize {fmt} file: {e}', 'file': file_path}
+
+    result = {
+        'success': True,
+        'original_file': file_path,
+        'anonymized_file': str(anonymized_path),
+        'audit_log': audit_log_path,
+        'strategy': strategy,
+        'format': fmt,
+        'summary': summary,
+    }
+    if profile_report:
+        result['profile'] = profile_report
+    return result
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+bench_harvest.py — harvest throughput of extract_turns.py on a synthetic transcript.
+
+Generates a Claude Code–shaped .jsonl (user prompts, assistant turns with tool_use blocks,
+large tool_result user lines, progress events that nest user/assistant messages, system
+lines; a share of assistant turns end with a `<!-- ckpt ... -->` trailer), then times:
+
+  read          raw binary read of the file — the disk-bound floor
+  marker scan   the raw-bytes `ckpt` prefilter alone
+  decode all    every turn decoded and flattened, then _CKPT_RE (harvest before the prefilter)
+  stream        harvest with CHECKPOINT_NO_INDEX=1 (turns numbered, trailers parsed on marker lines only)
+  index cold    harvest that builds the sidecar index from scratch
+  index warm    harvest answered from the stored index
+  index delta   harvest after appending ~1% new lines (resumable: parses only the delta)
+
+Usage:
+  python bench/bench_harvest.py [--size-mb 50] [--trailer-rate 0.1] [--repeat 3] [--output report.json]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+import extract_turns  # noqa: E402
+
+WORDS = ("the parser keeps a verbatim copy of each turn so the checkpoint never rewords what "
+         "the user said and the trailer carries the distilled decision for a cold resume").split()
+TOOLS = ("Read", "Bash", "Edit", "Grep", "Write")
+
+
+def _prose(rng, lo, hi):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(lo, hi)))
+
+
+def _trailer(rng, n):
+    return (f"\n\n<!-- ckpt\ndecision: option {n} — {_prose(rng, 5, 12)}\n"
+            f"learning: {_prose(rng, 4, 10)}\nrefs: scripts/extract_turns.py → load_index\n-->")
+
+
+def synthetic_transcript(path, size, trailer_rate=0.1, seed=7):
+    """Write about size bytes of transcript lines to path; deterministic for a seed"""
+    rng = random.Random(seed)
+    written, n = 0, 0
+    with open(path, "w", encoding="utf-8") as f:
+        while written < size:
+            n += 1
+            kind = rng.random()
+            if kind < 0.15:
+                event = {"type": "user", "message": {"role": "user", "content": _prose(rng, 5, 60)}}
+            elif kind < 0.45:
+                text = _prose(rng, 20, 400) + (_trailer(rng, n) if rng.random() < trailer_rate else "")
+                event = {"type": "assistant", "message": {"role": "assistant", "content": [
+                    {"type": "text", "text": text},
+                    {"type": "tool_use", "name": rng.choice(TOOLS), "input": {"command": _prose(rng, 5, 40)}}]}}
+            elif kind < 0.75:
+                event = {"type": "user", "message": {"role": "user", "content": [
+                    {"type": "tool_result", "tool_use_id": f"toolu_{n}", "content": _prose(rng, 200, 3000)}]}}
+            elif kind < 0.95:
+                event = {"type": "progress", "data": {"message": {"type": "assistant", "message": {
+                    "content": [{"type": "text", "text": _prose(rng, 10, 80)}]}}}}
+            else:
+                event = {"type": "system", "subtype": "informational", "content": _prose(rng, 3, 12)}
+            line = json.dumps({"uuid": f"{n:08x}", **event}, ensure_ascii=False) + "\n"
+            f.write(line)
+            written += len(line.encode("utf-8"))
+    return written
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        while f.read(1 << 20):
+            pass
+
+
+def _marker_scan(path):
+    with open(path, "rb") as f:
+        return sum(1 for line in f if extract_turns._CKPT_MARK in line)
+
+
+def _decode_all(path):
+    out = []
+    for t in extract_turns.iter_turns(path, max_chars=None):
+        fields = extract_turns._trailer_fields(t["role"], t["text"])
+        if fields:
+            out.append({"id": t["id"], "fields": fields})
+    return out
+
+
+def _indexed_harvest(path):
+    return extract_turns._index_harvest(extract_turns.load_index(path))
+
+
+def _clear_index(path):
+    try:
+        os.remove(extract_turns._index_path(path))
+    except OSError:
+        pass
+
+
+def best_of(fn, repeat, setup=None):
+    timings, result = [], None
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ckpt trailer harvest on a synthetic transcript")
+    parser.add_argument("--size-mb", type=float, default=50)
+    parser.add_argument("--trailer-rate", type=float, default=0.1, help="Share of assistant turns with a trailer")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="JSON report path (default: stdout)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["CHECKPOINT_CACHE_DIR"] = os.path.join(tmp, "cache")
+        path = os.path.join(tmp, "transcript.jsonl")
+        size = synthetic_transcript(path, int(args.size_mb * 1e6), args.trailer_rate, args.seed)
+        delta_path = os.path.join(tmp, "delta.jsonl")
+        synthetic_transcript(delta_path, size // 100, args.trailer_rate, args.seed + 1)
+        with open(delta_path, "rb") as f:
+            delta = f.read()
+
+        stages, results = {}, {}
+        stages["read"], _ = best_of(lambda: _read(path), args.repeat)
+        stages["marker scan"], _ = best_of(lambda: _marker_scan(path), args.repeat)
+        stages["decode all"], results["decode all"] = best_of(lambda: _decode_all(path), args.repeat)
+        stages["stream"], results["stream"] = best_of(lambda: extract_turns._harvest_stream(path), args.repeat)
+        stages["index cold"], results["index cold"] = best_of(
+            lambda: _indexed_harvest(path), args.repeat, setup=lambda: _clear_index(path))
+        stages["index warm"], results["index warm"] = best_of(lambda: _indexed_harvest(path), args.repeat)
+
+        def append_delta():  # a fresh base index, then ~1% more lines
+            with open(path, "r+b") as f:
+                f.truncate(size)
+            _indexed_harvest(path)
+            with open(path, "ab") as f:
+                f.write(delta)
+        stages["index delta"], _ = best_of(lambda: _indexed_harvest(path), args.repeat, setup=append_delta)
+
+    expected = results["decode all"]
+    assert all(r == expected for r in results.values()), "harvest paths disagree"
+    for stage, seconds in stages.items():
+        print(f"{stage:12} {seconds * 1000:9.1f} ms  {size / 1e6 / seconds:9.1f} MB/s", file=sys.stderr)
+
+    report = {
+        "config": {"size_bytes": size, "trailer_rate": args.trailer_rate, "seed": args.seed, "repeat": args.repeat},
+        "trailers": len(expected),
+        "stages": {stage: round(seconds, 6) for stage, seconds in stages.items()},
+        "mb_per_s": {stage: round(size / 1e6 / seconds, 1) for stage, seconds in stages.items()},
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
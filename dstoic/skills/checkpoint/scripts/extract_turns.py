@@ -3,11 +3,13 @@
 extract_turns.py — parse a Claude Code .jsonl transcript into numbered turns,
 and copy verbatim turn text BY ID (never regenerated by an LLM).
 
-Three subcommands:
+Subcommands:
   index   <transcript.jsonl>            -> emits [{id, role, text}, ...] as JSON (for the Sonnet triage agent)
   collect <transcript.jsonl> <ids...>   -> emits {id: verbatim_text, ...} for the given ids (verbatim copy)
   harvest <transcript.jsonl>            -> emits [{id, fields:{...}}, ...] from `<!-- ckpt ... -->` trailers
                                           in ASSISTANT turns (author-distilled meat; primary path — 0 LLM)
+  all     <transcript.jsonl> [ids...]   -> emits {"index": [...], "harvest": [...], "collect": {...}}: the three
+                                          above in ONE process and ONE pass (each value byte-equal to its subcommand)
 
 Design contract (see memory: llm-extractif-verbatim-par-code):
   - The LLM DESIGNATES which turns matter (returns ids). This script COPIES the text.
@@ -17,11 +19,26 @@ Robustness: the .jsonl schema is UNDOCUMENTED and Anthropic may change it.
   - `content` is polymorphic (str OR list of blocks) — both handled, unknown -> logged, not crashed.
   - On any structural failure, exit code 2 with a diagnostic on stderr so the skill can fall back to os-only.
   - --max-chars caps per-turn text to avoid an obese checkpoint (default 4000).
+
+Scale: transcripts reach hundreds of MB. Turns are streamed line by line (iter_turns), and
+lines whose bytes can't hold a user/assistant event are skipped before any JSON decoding,
+so memory stays flat in transcript size. A sidecar index (load_index) records where each turn
+sits, so repeat runs only parse appended lines and collect/harvest seek to the turns they need.
 """
+import hashlib
 import json
 import os
 import re
 import sys
+import tempfile
+
+# Byte-level sniff run before json.loads: progress/system/summary events (most of a long
+# transcript) never carry a "type":"user"|"assistant" pair, so they are never decoded.
+# False positives are fine (the decoded event is checked again); it only has to never miss.
+_TURN_SNIFF = re.compile(rb'"type"\s*:\s*"(?:user|assistant)"')
+# Raw-bytes test run before any trailer parsing: most assistant turns carry no trailer,
+# and JSON escaping never touches these letters, so a line without them has none.
+_CKPT_MARK = b"ckpt"
 
 SCHEMA_NOTE = "expected Claude Code transcript: one JSON event per line, type in {user,assistant}, message.content str|list"
 
@@ -101,101 +118,312 @@ def _extract_text(content):
     return None
 
 
-def load_turns(path, max_chars=4000):
-    """Return list of {id, role, text}. Raises RuntimeError on structural failure (-> os-only fallback)."""
+_UNKNOWN = object()  # _parse_line: a user/assistant event whose content shape is unknown
+
+
+def _parse_line(line):
+    """(role, text) of one transcript line if it is a turn; None if not; _UNKNOWN on unknown content"""
+    if not _TURN_SNIFF.search(line):
+        return None
     try:
-        raw = open(path, encoding="utf-8").read().splitlines()
-    except OSError as e:
-        raise RuntimeError(f"cannot read transcript: {e}")
+        r = json.loads(line)
+    except ValueError:
+        return None  # tolerate a stray non-JSON (or non-UTF-8) line
+    if not isinstance(r, dict):
+        return None
+    if r.get("type") not in ("user", "assistant"):
+        return None
+    msg = r.get("message", {})
+    if not isinstance(msg, dict):
+        return None
+    txt = _extract_text(msg.get("content"))
+    if txt is None:
+        return _UNKNOWN
+    txt = txt.strip()
+    if not txt:
+        return None
+    # drop system-injected pure tool-result user turns
+    if r.get("type") == "user" and txt.startswith("[tool_result"):
+        return None
+    return r["type"], txt
 
-    turns = []
-    tid = 0
-    unknown_content = 0
-    for line in raw:
-        line = line.strip()
-        if not line:
-            continue
-        try:
-            r = json.loads(line)
-        except json.JSONDecodeError:
-            continue  # tolerate a stray non-JSON line
-        if not isinstance(r, dict):
-            continue
-        if r.get("type") not in ("user", "assistant"):
-            continue
-        msg = r.get("message", {})
-        if not isinstance(msg, dict):
-            continue
-        txt = _extract_text(msg.get("content"))
-        if txt is None:
-            unknown_content += 1
-            continue
-        txt = txt.strip()
-        if not txt:
-            continue
-        # drop system-injected pure tool-result user turns
-        if r.get("type") == "user" and txt.startswith("[tool_result"):
-            continue
-        tid += 1
-        turns.append({"id": tid, "role": r["type"], "text": txt[:max_chars]})
 
+def _check_schema(tid, unknown_content):
     if tid == 0:
         raise RuntimeError(f"no user/assistant turns parsed — schema drift? ({SCHEMA_NOTE})")
     if unknown_content and unknown_content > tid:
         raise RuntimeError(f"majority of turns had unknown content shape ({unknown_content}) — schema drift?")
-    return turns
 
 
-def main(argv):
-    if len(argv) < 3:
-        print("usage: extract_turns.py <index|collect> <transcript.jsonl> [ids...]", file=sys.stderr)
-        return 2
-    cmd, path = argv[1], argv[2]
+def _iter_parsed(path):
+    """(raw line, role, text) per turn, streaming the file. Raises RuntimeError like iter_turns."""
     try:
-        turns = load_turns(path)
-    except RuntimeError as e:
-        print(f"PARSE_FAILED: {e}", file=sys.stderr)
-        return 2  # skill sees non-zero -> os-only fallback
-
-    if cmd == "index":
-        json.dump(turns, sys.stdout, ensure_ascii=False)
-        return 0
+        f = open(path, "rb")
+    except OSError as e:
+        raise RuntimeError(f"cannot read transcript: {e}")
 
-    if cmd == "harvest":
-        # Parse ckpt trailers from ASSISTANT turns. Harvest from UNTRUNCATED text
-        # (trailers sit at the end of a turn; the index cap could clip them).
-        try:
-            full = load_turns(path, max_chars=10**9)
-        except RuntimeError as e:
-            print(f"PARSE_FAILED: {e}", file=sys.stderr)
-            return 2
-        out = []
-        for t in full:
-            if t["role"] != "assistant":
+    tid = 0
+    unknown_content = 0
+    with f:
+        for line in f:
+            turn = _parse_line(line)
+            if turn is None:
                 continue
-            blocks = _CKPT_RE.findall(t["text"])
-            if not blocks:
+            if turn is _UNKNOWN:
+                unknown_content += 1
                 continue
-            # keep the LAST trailer in the turn (the canonical end-of-answer one)
-            fields = _parse_trailer(blocks[-1])
+            tid += 1
+            yield line, turn[0], turn[1]
+    _check_schema(tid, unknown_content)
+
+
+def iter_turns(path, max_chars=4000):
+    """Yield {id, role, text} one turn at a time, streaming the file (max_chars=None: untruncated).
+
+    Raises RuntimeError on structural failure (-> os-only fallback): unreadable file at the first
+    next(), schema drift once the stream is exhausted.
+    """
+    for tid, (_, role, txt) in enumerate(_iter_parsed(path), 1):
+        yield {"id": tid, "role": role, "text": txt[:max_chars]}
+
+
+def _harvest_stream(path):
+    """harvest without the index: every turn is still numbered, but only lines whose raw
+    bytes hold the ckpt marker are searched for a trailer"""
+    out = []
+    for tid, (line, role, txt) in enumerate(_iter_parsed(path), 1):
+        if _CKPT_MARK in line:
+            fields = _trailer_fields(role, txt)
             if fields:
-                out.append({"id": t["id"], "fields": fields})
-        json.dump(out, sys.stdout, ensure_ascii=False, indent=1)
-        return 0
+                out.append({"id": tid, "fields": fields})
+    return out
+
+
+# ── Sidecar turn index ───────────────────────────────────────────────────
+# Every subcommand used to re-parse the whole transcript. The sidecar maps turn id ->
+# [byte offset, byte length, role, text hash, ckpt trailer fields or false]. It is built
+# once, then only lines appended since are parsed: harvest is answered from the stored
+# trailer fields (resumable: O(appended lines), not O(transcript)), and collect seeks
+# straight to the lines it needs.
+# The trailer fields are transcript content (decisions, refs, ...), so the sidecar is as
+# sensitive as the transcript itself: it is written owner-only (0600, in a 0700 dir),
+# never looser than the transcript, and belongs wherever the transcript may be kept.
+# Location: $CHECKPOINT_CACHE_DIR or ~/.cache/checkpoint/<hash of real path>.idx.json.
+# Disable: CHECKPOINT_NO_INDEX=1 (every subcommand streams the file instead).
+INDEX_VERSION = 2
+_HEAD_BYTES = 4096  # hashed to notice a transcript replaced (not appended to) under its index
+
+
+def _index_path(path):
+    base = os.environ.get("CHECKPOINT_CACHE_DIR") or os.path.join(
+        os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "checkpoint")
+    key = hashlib.sha256(os.path.realpath(path).encode("utf-8", "surrogateescape")).hexdigest()[:32]
+    return os.path.join(base, f"{key}.idx.json")
+
+
+def _text_hash(text):
+    return hashlib.sha256(text.encode("utf-8", "surrogatepass")).hexdigest()[:16]
 
-    if cmd == "collect":
+
+def _read_index(path, f):
+    """Stored index if it still describes a prefix of the file, else a fresh empty one"""
+    fresh = {"version": INDEX_VERSION, "size": 0, "head": None, "unknown": 0, "turns": []}
+    try:
+        with open(_index_path(path), encoding="utf-8") as fh:
+            index = json.load(fh)
+        size = index["size"]
+        if index.get("version") != INDEX_VERSION or size > os.fstat(f.fileno()).st_size:
+            return fresh  # truncated or rewritten: rebuild
+        f.seek(0)
+        if size and hashlib.sha256(f.read(min(size, _HEAD_BYTES))).hexdigest() != index["head"]:
+            return fresh
+        if size:
+            f.seek(size - 1)
+            if f.read(1) != b"\n":
+                return fresh
+        if index["turns"]:  # the last indexed turn must still be where the index says
+            offset, length, _, text_hash = index["turns"][-1][:4]
+            f.seek(offset)
+            turn = _parse_line(f.read(length))
+            if turn is None or turn is _UNKNOWN or _text_hash(turn[1]) != text_hash:
+                return fresh
+        return index
+    except (OSError, ValueError, KeyError, TypeError):
+        return fresh
+
+
+def _write_index(path, index):
+    """Persist atomically, owner-only; an unwritable cache only costs a re-parse next time"""
+    target = _index_path(path)
+    try:
+        os.makedirs(os.path.dirname(target), mode=0o700, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(target), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            json.dump(index, fh, separators=(",", ":"))
+        os.replace(tmp, target)
+    except OSError:
+        pass
+
+
+def load_index(path):
+    """Turn index of path, extended with the lines appended since it was stored.
+
+    A trailing line without its newline (still being written) is indexed for this run but not
+    stored. Raises RuntimeError on an unreadable file or schema drift (-> os-only fallback).
+    """
+    try:
+        f = open(path, "rb")
+    except OSError as e:
+        raise RuntimeError(f"cannot read transcript: {e}")
+    with f:
+        index = _read_index(path, f)
+        stored = index["size"]
+        offset = stored
+        f.seek(offset)
+        for line in f:
+            turn = _parse_line(line)
+            if turn is _UNKNOWN:
+                index["unknown"] += 1
+            elif turn is not None:
+                role, txt = turn
+                # harvested once, on first sight; most lines fail the raw marker test
+                trailer = (_CKPT_MARK in line and _trailer_fields(role, txt)) or False
+                index["turns"].append([offset, len(line), role, _text_hash(txt), trailer])
+            offset += len(line)
+            if line.endswith(b"\n"):
+                index["size"], index["complete"] = offset, len(index["turns"])
+        if index["size"] != stored:
+            if index["head"] is None or stored < _HEAD_BYTES:  # the hashed prefix grew with the file
+                f.seek(0)
+                index["head"] = hashlib.sha256(f.read(min(index["size"], _HEAD_BYTES))).hexdigest()
+            persisted = dict(index, turns=index["turns"][:index.pop("complete")])
+            _write_index(path, persisted)
+        index.pop("complete", None)
+    _check_schema(len(index["turns"]), index["unknown"])
+    return index
+
+
+def read_turns(path, index, ids, max_chars=4000):
+    """Yield {id, role, text} for the given ids (ascending; unknown ids skipped) by seeking to their lines.
+
+    Raises RuntimeError if a line no longer matches its indexed hash (file rewritten in place).
+    """
+    turns = index["turns"]
+    with open(path, "rb") as f:
+        for tid in sorted(ids):
+            if not 1 <= tid <= len(turns):
+                continue
+            offset, length, role, text_hash = turns[tid - 1][:4]
+            f.seek(offset)
+            turn = _parse_line(f.read(length))
+            if turn is None or turn is _UNKNOWN or _text_hash(turn[1]) != text_hash:
+                raise RuntimeError(f"transcript changed under its index at turn {tid} "
+                                   f"(delete {_index_path(path)} or set CHECKPOINT_NO_INDEX=1)")
+            yield {"id": tid, "role": role, "text": turn[1][:max_chars]}
+
+
+def load_turns(path, max_chars=4000):
+    """Return list of {id, role, text}. Raises RuntimeError on structural failure (-> os-only fallback)."""
+    return list(iter_turns(path, max_chars))
+
+
+def _trailer_fields(role, text):
+    """Fields of the LAST `<!-- ckpt ... -->` trailer of an assistant turn, else None"""
+    if role != "assistant":
+        return None
+    blocks = _CKPT_RE.findall(text)
+    if not blocks:
+        return None
+    # keep the LAST trailer in the turn (the canonical end-of-answer one)
+    return _parse_trailer(blocks[-1]) or None
+
+
+def _index_harvest(index):
+    """harvest from the trailer fields stored as the index grew: nothing left to read"""
+    return [{"id": tid, "fields": e[4]} for tid, e in enumerate(index["turns"], 1) if e[4]]
+
+
+def _turns_harvesting(path, harvested, max_chars=4000):
+    """iter_turns that also appends each turn's harvest to harvested as it goes (one pass for `all`);
+    trailers are searched in the UNTRUNCATED text of lines holding the raw ckpt marker"""
+    for tid, (line, role, txt) in enumerate(_iter_parsed(path), 1):
+        if _CKPT_MARK in line:
+            fields = _trailer_fields(role, txt)
+            if fields:
+                harvested.append({"id": tid, "fields": fields})
+        yield {"id": tid, "role": role, "text": txt[:max_chars]}
+
+
+def _all(turns, harvested, ids, out):
+    """index + harvest + collect written to out as one JSON object; harvested is read once turns is exhausted"""
+    collected = {}
+    for n, t in enumerate(turns):
+        out.write((", " if n else '{"index": [') + json.dumps(t, ensure_ascii=False))
+        if t["id"] in ids:
+            collected[t["id"]] = t["text"]
+    collect = {str(i): _redact(collected[i]) for i in sorted(ids) if i in collected}
+    out.write('], "harvest": ' + json.dumps(harvested, ensure_ascii=False, indent=1)
+              + ', "collect": ' + json.dumps(collect, ensure_ascii=False, indent=1) + "}")
+
+
+def main(argv):
+    if len(argv) < 3:
+        print("usage: extract_turns.py <index|collect|harvest|all> <transcript.jsonl> [ids...]", file=sys.stderr)
+        return 2
+    cmd, path = argv[1], argv[2]
+    if cmd not in ("index", "harvest", "collect", "all"):
+        print(f"unknown subcommand: {cmd}", file=sys.stderr)
+        return 2
+    if cmd in ("collect", "all"):
         try:
             ids = {int(x) for x in argv[3:]}
         except ValueError:
-            print("collect: ids must be integers", file=sys.stderr)
+            print(f"{cmd}: ids must be integers", file=sys.stderr)
             return 2
-        by_id = {t["id"]: t["text"] for t in turns}
+
+    try:
+        index = None if os.environ.get("CHECKPOINT_NO_INDEX") else load_index(path)
+
+        if cmd == "index":
+            # Streamed out as read; same bytes as json.dump(list). A parse failure
+            # leaves partial output, but the non-zero exit already sends the skill to os-only.
+            turns = iter_turns(path) if index is None else read_turns(path, index, range(1, len(index["turns"]) + 1))
+            for n, t in enumerate(turns):
+                sys.stdout.write((", " if n else "[") + json.dumps(t, ensure_ascii=False))
+            sys.stdout.write("]")
+            return 0
+
+        if cmd == "all":
+            if index is None:
+                harvested = []
+                turns = _turns_harvesting(path, harvested)
+            else:
+                harvested = _index_harvest(index)
+                turns = read_turns(path, index, range(1, len(index["turns"]) + 1))
+            _all(turns, harvested, ids, sys.stdout)
+            return 0
+
+        if cmd == "harvest":
+            # Harvest from UNTRUNCATED text (trailers sit at the end of a turn; the index cap could clip them).
+            out = _harvest_stream(path) if index is None else _index_harvest(index)
+            json.dump(out, sys.stdout, ensure_ascii=False, indent=1)
+            return 0
+
+        if index is None:
+            by_id = {}
+            for t in iter_turns(path):
+                if t["id"] in ids:
+                    by_id[t["id"]] = t["text"]
+                    if len(by_id) == len(ids):
+                        break  # every requested turn found: skip the rest of the transcript
+        else:
+            by_id = {t["id"]: t["text"] for t in read_turns(path, index, ids)}
         out = {str(i): _redact(by_id[i]) for i in sorted(ids) if i in by_id}
         json.dump(out, sys.stdout, ensure_ascii=False, indent=1)
         return 0
-
-    print(f"unknown subcommand: {cmd}", file=sys.stderr)
-    return 2
+    except RuntimeError as e:
+        print(f"PARSE_FAILED: {e}", file=sys.stderr)
+        return 2  # skill sees non-zero -> os-only fallback
 
 
 if __name__ == "__main__":